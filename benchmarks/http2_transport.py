@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Compare the HTTP/1.1 and HTTP/2 transports against a local mock API
+
+Serves paginated JSON from an HTTP/2 capable server (hypercorn, h2c with
+prior knowledge) that delays each response to simulate network latency, then
+fetches the same pages concurrently through Api with each transport.
+
+Requires the http2 extra and hypercorn:
+
+$ pip install gitem[http2] hypercorn
+$ PYTHONPATH=lib/ python benchmarks/http2_transport.py
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+import requests
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+from gitem import api
+from gitem import transport
+
+
+class MockApi(object):
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.connections = set()
+        self.body = json.dumps([{"sha": "{:040x}".format(i)} for i in range(100)]).encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        self.connections.add(tuple(scope["client"]))
+        await asyncio.sleep(self.latency)
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self.body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(app, port):
+    config = Config()
+    config.bind = ["127.0.0.1:{}".format(port)]
+    config.accesslog = None
+    config.errorlog = None
+
+    # A shutdown trigger stops hypercorn installing signal handlers, which
+    # only works in the main thread
+    loop = asyncio.new_event_loop()
+    never = asyncio.Event()
+    server = serve(app, config, shutdown_trigger=never.wait)
+    thread = threading.Thread(target=loop.run_until_complete, args=(server,))
+    thread.daemon = True
+    thread.start()
+
+    # Wait for the server to accept connections
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except socket.error:
+            time.sleep(0.05)
+
+
+def run(name, requester, app, base_url, requests_count, concurrency):
+    # Authenticated so the token pool doesn't stop at the anonymous limit
+    ghapi = api.Api(oauth2_token="benchmark", requester=requester)
+    urls = ["{}/repos/o/r{}/commits".format(base_url, i) for i in range(requests_count)]
+
+    app.connections.clear()
+    pool = ThreadPool(concurrency)
+    start = time.time()
+    pool.map(lambda url: ghapi.call("GET", url), urls)
+    elapsed = time.time() - start
+    pool.close()
+
+    print("{:<10} {:>8.2f}s {:>8.1f} req/s {:>6} connections".format(
+        name,
+        elapsed,
+        requests_count / elapsed,
+        len(app.connections)
+    ))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument('-n', '--requests', type=int, default=500, help='number of requests')
+    p.add_argument('-c', '--concurrency', type=int, default=50, help='concurrent requests')
+    p.add_argument('-l', '--latency', type=float, default=0.05, help='simulated latency in seconds')
+    args = p.parse_args()
+
+    app = MockApi(args.latency)
+    port = free_port()
+    start_server(app, port)
+    base_url = "http://127.0.0.1:{}".format(port)
+
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    run("HTTP/1.1", session.request, app, base_url, args.requests, args.concurrency)
+
+    # Plain text HTTP/2 needs prior knowledge, api.github.com negotiates it
+    # over TLS instead
+    http2 = transport.Http2Requester(http1=False)
+    run("HTTP/2", http2, app, base_url, args.requests, args.concurrency)
+    http2.close()
+
+
+if __name__ == "__main__":
+    main()
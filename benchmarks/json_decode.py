@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Compare the JSON backends decoding API responses
+
+Pass files containing recorded response bodies, for example saved with
+`curl -o commits.json 'https://api.github.com/repos/OWNER/REPO/commits?per_page=100'`.
+Without arguments a synthetic page of 100 commits is used.
+
+$ PYTHONPATH=lib/ python benchmarks/json_decode.py [PAYLOAD ...]
+"""
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import argparse
+import json
+import os
+import timeit
+
+from gitem import codec
+
+
+def synthetic_commit(i):
+    identity = {
+        "name": "Name {}".format(i),
+        "email": "user{}@example.com".format(i),
+        "date": "2020-01-01T00:00:00Z",
+    }
+    user = {
+        "login": "user{}".format(i),
+        "id": i,
+        "avatar_url": "https://avatars.githubusercontent.com/u/{}?v=4".format(i),
+        "url": "https://api.github.com/users/user{}".format(i),
+        "html_url": "https://github.com/user{}".format(i),
+        "type": "User",
+        "site_admin": False,
+    }
+    sha = "{:040x}".format(i)
+
+    return {
+        "sha": sha,
+        "node_id": "C_{}".format(sha),
+        "commit": {
+            "author": identity,
+            "committer": identity,
+            "message": "Commit message {}\n\nWith a longer body explaining the change.".format(i),
+            "tree": {"sha": sha, "url": "https://api.github.com/repos/o/r/git/trees/" + sha},
+            "url": "https://api.github.com/repos/o/r/git/commits/" + sha,
+            "comment_count": 0,
+            "verification": {"verified": False, "reason": "unsigned", "signature": None, "payload": None},
+        },
+        "url": "https://api.github.com/repos/o/r/commits/" + sha,
+        "html_url": "https://github.com/o/r/commit/" + sha,
+        "author": user,
+        "committer": user,
+        "parents": [{"sha": sha, "url": "https://api.github.com/repos/o/r/commits/" + sha}],
+    }
+
+
+def synthetic_payload():
+    return json.dumps([synthetic_commit(i) for i in range(100)]).encode("utf-8")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument('payloads', nargs='*', help='files containing recorded response bodies')
+    p.add_argument('-n', '--number', type=int, default=200, help='decodes per measurement')
+    args = p.parse_args()
+
+    payloads = []
+    for path in args.payloads:
+        with open(path, 'rb') as fd:
+            payloads.append((os.path.basename(path), fd.read()))
+    if not payloads:
+        payloads.append(("synthetic 100 commits", synthetic_payload()))
+
+    for name, payload in payloads:
+        print("{} ({} bytes)".format(name, len(payload)))
+
+        # What response.json() does, build a text string then decode it
+        baseline = min(timeit.repeat(
+            lambda: json.loads(payload.decode("utf-8")),
+            number=args.number,
+            repeat=5
+        ))
+        print("  {:<24} {:>10.1f}us".format("json via text", baseline / args.number * 1e6))
+
+        for backend in codec.BACKENDS.values():
+            elapsed = min(timeit.repeat(
+                lambda: backend.loads(payload),
+                number=args.number,
+                repeat=5
+            ))
+            print("  {:<24} {:>10.1f}us {:>6.2f}x".format(
+                backend.name,
+                elapsed / args.number * 1e6,
+                baseline / elapsed
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,107 +11,273 @@ import argparse
 import collections
 import functools
 import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from . import api
 from . import analytics
+from . import cache
+from . import checkpoint
 from . import output
+from . import pipeline
+from . import profiling
+from . import scheduler
+from . import server
+from . import snapshot
+from . import transport
 
 CONCISE_COUNT = 5
 
 
+def checkpointed(state, key, func, *args):
+    """
+    Return the result of func, or the result recorded by an earlier run
+    """
+    if state is None:
+        return func(*args)
+
+    result = state.get(key)
+    if result is None:
+        result = func(*args)
+        state.set(key, result)
+
+    return result
+
+
+def run_stage(profiler, name, func, *args):
+    with profiling.stage(profiler, name):
+        return scheduler.capture(func, *args)
+
+
+class StageResult(object):
+    """
+    The result of a stage started by start_stages
+    """
+
+    def __init__(self, result):
+        self.result = result
+
+    def get(self):
+        """
+        Wait for the stage and return its result, raising what it raised
+        """
+        return scheduler.unwrap(self.result.get())
+
+
+def start_stages(profiler, *stages):
+    """
+    Start independent (name, func, *args) stages on their own threads
+
+    Returns a StageResult per stage, in order, so results can be output
+    deterministically as each one becomes available.
+    """
+    pool = ThreadPool(processes=len(stages))
+    results = [
+        StageResult(pool.apply_async(run_stage, (profiler,) + stage))
+        for stage in stages
+    ]
+
+    # Workers exit once their stage is done
+    pool.close()
+
+    return results
+
+
+def member_administrator(member):
+    return member['Site Administrator']
+
+
+def repository_popularity(repository):
+    return (
+        int(repository['Watchers'])
+        + int(repository['Stars'])
+        + int(repository['Forks'])
+    )
+
+
 def organization(ghapi, outputter, *args, **kwargs):
     organization = kwargs['name']
     verbose = kwargs['verbose']
+    state = kwargs.get('checkpoint')
+    profiler = kwargs.get('profiler')
 
-    organization_info = analytics.get_organization_information(
-        ghapi,
-        organization
-    )
+    # Records stream past the selection, only the shown ones are kept
+    count = None if verbose else CONCISE_COUNT
 
-    outputter.output(organization_info)
+    if kwargs.get('delta'):
+        # Only the repositories pushed to since the last scan are listed
+        repositories_stage = (
+            "repositories",
+            analytics.get_organization_repositories_delta,
+            ghapi,
+            organization,
+            snapshot.Snapshot(kwargs['delta']),
+        )
+    else:
+        repositories_stage = (
+            "repositories",
+            checkpointed,
+            state,
+            "organization/{}/repositories/{}".format(organization, count),
+            pipeline.largest,
+            analytics.iter_organization_repositories(ghapi, organization),
+            repository_popularity,
+            count,
+        )
 
-    organization_members = analytics.get_organization_members(
-        ghapi,
-        organization
+    organization_info, organization_members, organization_repositories = start_stages(
+        profiler,
+        (
+            "information",
+            checkpointed,
+            state,
+            "organization/{}/information".format(organization),
+            analytics.get_organization_information,
+            ghapi,
+            organization,
+        ),
+        (
+            "members",
+            checkpointed,
+            state,
+            "organization/{}/members/{}".format(organization, count),
+            pipeline.largest,
+            analytics.iter_organization_members(ghapi, organization),
+            member_administrator,
+            count,
+        ),
+        repositories_stage,
     )
 
-    def member_administrator(member):
-        return member['Site Administrator']
+    organization_emails = None
+    if kwargs.get('fast'):
+        # Recent pushes are a quick sample of the identities in the
+        # organization's repositories
+        organization_emails, = start_stages(
+            profiler,
+            ("events", analytics.get_organization_event_emails, ghapi, organization),
+        )
 
-    members = sorted(
-        organization_members,
-        key=member_administrator,
-        reverse=True
-    )
+    outputter.output(organization_info.get())
+
+    members = organization_members.get()
+
+    if kwargs.get('members_detail'):
+        with profiling.stage(profiler, "member details"):
+            members = checkpointed(
+                state,
+                "organization/{}/members-detail/{}".format(organization, count),
+                analytics.get_members_detail,
+                ghapi,
+                members,
+                kwargs.get('member_workers') or analytics.DEFAULT_MEMBER_WORKERS
+            )
 
-    member_count = len(members) if verbose else CONCISE_COUNT
     outputter.output(collections.OrderedDict([
         ("Public Members", collections.OrderedDict([
             (member["Username"], collections.OrderedDict([
                 (human_readable_name, api_info)
                 for human_readable_name, api_info in member.items()
             ]))
-            for member in members[:member_count]
+            for member in members
         ]))
     ]))
 
-    organization_repositories = analytics.get_organization_repositories(
-        ghapi,
-        organization
-    )
-
-    def repository_popularity(repository):
-        return (
-            int(repository['Watchers'])
-            + int(repository['Stars'])
-            + int(repository['Forks'])
-        )
-
-    repositories = sorted(
-        organization_repositories,
-        key=repository_popularity,
-        reverse=True
-    )
+    changed_repositories = None
+    repositories = organization_repositories.get()
+    if kwargs.get('delta'):
+        repositories, changed_repositories = repositories
+        repositories = pipeline.largest(repositories, repository_popularity, count)
 
-    repository_count = len(repositories) if verbose else CONCISE_COUNT
     outputter.output(collections.OrderedDict([
         ("Public Repositories", collections.OrderedDict([
             (repository["Repository Name"], collections.OrderedDict([
                 (human_readable_name, api_info)
                 for human_readable_name, api_info in repository.items()
             ]))
-            for repository in repositories[:repository_count]
+            for repository in repositories
         ]))
     ]))
 
+    if changed_repositories is not None:
+        outputter.output(collections.OrderedDict([
+            ("Changed Repositories", [
+                repository["Repository Name"]
+                for repository in changed_repositories
+            ]),
+        ]))
+
+    if organization_emails is not None:
+        outputter.output(collections.OrderedDict([
+            ("Emails", [
+                str((name, email, source))
+                for name, email, source in organization_emails.get()
+            ]),
+        ]))
+
 
 def repository(ghapi, outputter, *args, **kwargs):
     repository = kwargs['name']
     owner = kwargs['owner']
     verbose = kwargs['verbose']
-
-    repository_info = analytics.get_repository_information(
-        ghapi,
-        owner,
-        repository
+    state = kwargs.get('checkpoint')
+    profiler = kwargs.get('profiler')
+
+    # Contributors come most active first, only the shown ones are fetched
+    count = None if verbose else CONCISE_COUNT
+
+    repository_info, repository_contributors = start_stages(
+        profiler,
+        (
+            "information",
+            checkpointed,
+            state,
+            "repository/{}/{}/information".format(owner, repository),
+            analytics.get_repository_information,
+            ghapi,
+            owner,
+            repository,
+        ),
+        (
+            "contributors",
+            checkpointed,
+            state,
+            "repository/{}/{}/contributors/{}".format(owner, repository, count),
+            pipeline.first,
+            analytics.iter_repository_contributors(ghapi, owner, repository),
+            count,
+        ),
     )
 
-    outputter.output(repository_info)
+    repository_statistics = None
+    if kwargs.get('statistics'):
+        # Polled while Github computes them, the other stages carry on
+        repository_statistics, = start_stages(
+            profiler,
+            (
+                "statistics",
+                checkpointed,
+                state,
+                "repository/{}/{}/statistics".format(owner, repository),
+                analytics.get_repository_contributor_statistics,
+                ghapi,
+                owner,
+                repository,
+            ),
+        )
 
-    repository_contributors = analytics.get_repository_contributors(
-        ghapi,
-        owner,
-        repository
-    )
+    outputter.output(repository_info.get())
+
+    contributors = repository_contributors.get()
+    if repository_statistics is not None:
+        contributors = analytics.add_contributor_statistics(contributors, repository_statistics.get())
 
-    contributor_count = len(repository_contributors) if verbose else CONCISE_COUNT
     outputter.output(collections.OrderedDict([
         ("Contributors", collections.OrderedDict([
             (contributor["Username"], collections.OrderedDict([
                 (human_readable_name, api_info)
                 for human_readable_name, api_info in contributor.items()
             ]))
-            for contributor in repository_contributors[:contributor_count]
+            for contributor in contributors
         ]))
     ]))
 
@@ -120,77 +286,189 @@ def user(ghapi, outputter, *args, **kwargs):
     username = kwargs['name']
     verbose = kwargs['verbose']
     processes = kwargs['processes']
-
-    user_info = analytics.get_user_information(
-        ghapi,
-        username
+    state = kwargs.get('checkpoint')
+    profiler = kwargs.get('profiler')
+
+    budget = analytics.CommitBudget(
+        since=kwargs.get('since'),
+        until=kwargs.get('until'),
+        max_pages=kwargs.get('max_pages'),
+        max_commits=kwargs.get('max_commits'),
+        max_stale_pages=kwargs.get('max_stale_pages')
     )
 
-    outputter.output(user_info)
+    seen = None
+    if kwargs.get('clone'):
+        email_fn = functools.partial(
+            analytics.get_repository_commit_emails_from_clone,
+            author_emails=analytics.get_user_author_emails(ghapi, username),
+            budget=budget,
+            checkpoint=state
+        )
+        email_field = 'Clone URL'
+    else:
+        if not kwargs.get('scan_shared_history'):
+            # Forks share their history with their parent and each other
+            seen = analytics.SeenCommits()
 
-    user_organizations = analytics.get_user_organizations(
-        ghapi,
-        username
-    )
+        email_fn = functools.partial(
+            analytics.get_repository_commit_emails,
+            ghapi,
+            username,
+            author=username,
+            budget=budget,
+            checkpoint=state,
+            seen=seen
+        )
+        email_field = 'Repository Name'
 
-    organization_count = len(user_organizations) if verbose else CONCISE_COUNT
-    outputter.output(collections.OrderedDict([
-        ("Organizations", collections.OrderedDict([
-            (organization["Organization"], collections.OrderedDict([
-                (human_readable_name, api_info)
-                for human_readable_name, api_info in organization.items()
+    # The run's seen commits are dropped even when the scan fails
+    try:
+        # Only the shown records are kept, the rest stream past
+        count = None if verbose else CONCISE_COUNT
+
+        prefilter = None
+        if kwargs.get('prefilter'):
+            # A contributor lookup only pays off against a clone, scanning a
+            # repository without the user's commits through the API is a single
+            # request as well
+            prefilter = analytics.Prefilter(username, ghapi if kwargs.get('clone') else None)
+
+        user_emails = None
+        if kwargs.get('fast'):
+            # A few pages of recent pushes stand in for scanning every repository
+            with profiling.stage(profiler, "events"):
+                user_emails = analytics.get_user_event_emails(ghapi, username)
+
+            if not user_emails and kwargs.get('fallback'):
+                user_emails = None
+
+        if user_emails is None and kwargs.get('search'):
+            # Search draws on its own rate limit, leaving the core budget for
+            # everything else
+            with profiling.stage(profiler, "search"):
+                user_emails = analytics.get_user_search_emails(ghapi, username, budget)
+
+            if not user_emails and kwargs.get('fallback'):
+                user_emails = None
+
+        scan = user_emails is None
+
+        # Repositories are handed to the email workers as soon as their listing
+        # page arrives instead of after the last page. Resuming lists them again,
+        # the scans themselves are checkpointed.
+        repository_queue = None
+        if scan:
+            repository_queue = scheduler.make_queue(kwargs.get('queue_size') or scheduler.QUEUE_SIZE)
+
+            # Worker processes are forked before any stage thread starts, a
+            # thread writing to the checkpoint or cache mid-fork would leave
+            # them holding its SQLite lock
+            if processes and kwargs.get('threads'):
+                pool = ThreadPool(processes=processes)
+            elif processes:
+                pool = multiprocessing.Pool(processes=processes)
+            else:
+                # A single worker thread keeps scanning serial while the listing
+                # and output carry on in this thread
+                pool = ThreadPool(processes=1)
+
+        user_info, user_organizations, user_repositories = start_stages(
+            profiler,
+            (
+                "information",
+                checkpointed,
+                state,
+                "user/{}/information".format(username),
+                analytics.get_user_information,
+                ghapi,
+                username,
+            ),
+            (
+                "organizations",
+                checkpointed,
+                state,
+                "user/{}/organizations/{}".format(username, count),
+                pipeline.first,
+                analytics.iter_user_organizations(ghapi, username),
+                count,
+            ),
+            (
+                "repositories",
+                scheduler.produce,
+                analytics.iter_user_repositories(ghapi, username),
+                repository_queue,
+                kwargs.get('skip_forks'),
+                kwargs.get('skip_archived'),
+                count,
+                prefilter,
+            ),
+        )
+
+        if scan:
+            # Hand out one repository at a time so idle workers pick up the next
+            # most expensive repository instead of waiting on a static chunk.
+            # Only as many as there are workers are handed out ahead, the rest
+            # wait on the queue so listing pauses while the workers fall behind.
+            user_repository_emails = scheduler.imap_bounded(
+                pool,
+                email_fn,
+                (
+                    repository[email_field]
+                    for repository in scheduler.consume(repository_queue)
+                ),
+                processes or 1
+            )
+            pool.close()
+
+            # Results are combined as they arrive, freeing the next hand out
+            # while listing carries on
+            combined_emails, = start_stages(
+                profiler,
+                ("emails", functools.reduce, set.union, user_repository_emails, set()),
+            )
+
+        outputter.output(user_info.get())
+
+        outputter.output(collections.OrderedDict([
+            ("Organizations", collections.OrderedDict([
+                (organization["Organization"], collections.OrderedDict([
+                    (human_readable_name, api_info)
+                    for human_readable_name, api_info in organization.items()
+                ]))
+                for organization in user_organizations.get()
             ]))
-            for organization in user_organizations[:organization_count]
         ]))
-    ]))
-
-    user_repositories = analytics.get_user_repositories(
-        ghapi,
-        username
-    )
 
-    repository_count = len(user_repositories) if verbose else CONCISE_COUNT
-    outputter.output(collections.OrderedDict([
-        ("Repositories", collections.OrderedDict([
-            (repository["Repository Name"], collections.OrderedDict([
-                (human_readable_name, api_info)
-                for human_readable_name, api_info in repository.items()
+        outputter.output(collections.OrderedDict([
+            ("Repositories", collections.OrderedDict([
+                (repository["Repository Name"], collections.OrderedDict([
+                    (human_readable_name, api_info)
+                    for human_readable_name, api_info in repository.items()
+                ]))
+                for repository in user_repositories.get()
             ]))
-            for repository in user_repositories[:repository_count]
         ]))
-    ]))
 
-    user_repository_names = [
-        repository['Repository Name']
-        for repository in user_repositories
-    ]
+        if scan and prefilter is not None:
+            outputter.output(collections.OrderedDict([
+                ("Skipped Repositories", prefilter.skipped),
+            ]))
 
-    if processes:
-        pool = multiprocessing.Pool(processes=processes)
-        partial_email_fn = functools.partial(
-            analytics.get_repository_commit_emails,
-            ghapi,
-            username,
-            author=username
-        )
-        user_repository_emails = pool.map(partial_email_fn, user_repository_names)
-    else:
-        user_repository_emails = [
-            analytics.get_repository_commit_emails(
-                ghapi,
-                username,
-                repository,
-                author=username
-            )
-            for repository in user_repository_names
-        ]
+        if scan:
+            user_emails = combined_emails.get()
+            pool.join()
 
-    user_emails = functools.reduce(set.union, user_repository_emails, set())
+        if seen is not None and profiler is not None:
+            profiler.count("commit requests saved", seen.saved_requests)
+    finally:
+        if seen is not None:
+            seen.close()
 
     outputter.output(collections.OrderedDict([
         ("Emails", [
-            str((name, email))
-            for name, email in user_emails
+            str((name, email, source))
+            for name, email, source in user_emails
         ]),
     ]))
 
@@ -203,8 +481,8 @@ def parse_args():
     p.add_argument(
         '-o',
         '--oauth2-token',
-        action='store',
-        help='OAuth2 token for authentcation'
+        action='append',
+        help='OAuth2 token for authentcation, repeat to spread requests across tokens'
     )
     p.add_argument(
         '-v',
@@ -219,6 +497,66 @@ def parse_args():
         type=int,
         help='number of processes (for applicable commands)'
     )
+    p.add_argument(
+        '--cache-dir',
+        action='store',
+        help='store responses in this directory and reuse them across processes and runs'
+    )
+    p.add_argument(
+        '--cache-ttl',
+        action='store',
+        type=int,
+        default=cache.DEFAULT_TTL,
+        help='seconds a cached response stays fresh (default: %(default)s)'
+    )
+    p.add_argument(
+        '--checkpoint',
+        action='store',
+        help='record progress in this file so an interrupted scan can be resumed'
+    )
+    p.add_argument(
+        '--resume',
+        action='store_true',
+        help='resume the scan recorded by --checkpoint instead of starting over'
+    )
+    p.add_argument(
+        '--http2',
+        action='store_true',
+        help='multiplex concurrent requests over HTTP/2 connections (requires the http2 extra)'
+    )
+    p.add_argument(
+        '--wait-for-reset',
+        action='store_true',
+        help='wait for the rate limit to reset instead of stopping when it runs out'
+    )
+    p.add_argument(
+        '--prefetch',
+        action='store',
+        type=int,
+        default=0,
+        help='request this many pages of paginated results ahead in the background (default: %(default)s)'
+    )
+    p.add_argument(
+        '--memory-limit',
+        action='store',
+        type=int,
+        help='megabytes of prefetched pages held at once across all paginated calls'
+    )
+    p.add_argument(
+        '--profile',
+        action='store_true',
+        help='print the time spent in each stage to stderr'
+    )
+    p.add_argument(
+        '--profile-stacks',
+        action='store',
+        help='sample stacks while running and write them to this file in collapsed flamegraph format'
+    )
+    p.add_argument(
+        '--profile-cprofile',
+        action='store',
+        help='run under cProfile and write its stats to this file'
+    )
     p.add_argument(
         '-t',
         '--output',
@@ -239,6 +577,28 @@ def parse_args():
         action='store',
         help='Github organization name'
     )
+    organization.add_argument(
+        '--members-detail',
+        action='store_true',
+        help="look up each member's profile and include it with the member"
+    )
+    organization.add_argument(
+        '--fast',
+        action='store_true',
+        help='find emails in the commits of recent public push events'
+    )
+    organization.add_argument(
+        '--delta',
+        action='store',
+        help='only list the repositories pushed to since the scan recorded in this file, then record this one'
+    )
+    organization.add_argument(
+        '--member-workers',
+        action='store',
+        type=int,
+        default=analytics.DEFAULT_MEMBER_WORKERS,
+        help='concurrent profile lookups for --members-detail (default: %(default)s)'
+    )
 
     repository = subparsers.add_parser('repository')
     repository.add_argument(
@@ -251,6 +611,11 @@ def parse_args():
         action='store',
         help='Github repository name'
     )
+    repository.add_argument(
+        '--statistics',
+        action='store_true',
+        help="add each contributor's commits, additions and deletions"
+    )
 
     user = subparsers.add_parser('user')
     user.add_argument(
@@ -258,9 +623,103 @@ def parse_args():
         action='store',
         help='Github user name'
     )
+    user.add_argument(
+        '--fast',
+        action='store_true',
+        help='find emails in the commits of recent public push events instead of scanning every repository'
+    )
+    user.add_argument(
+        '--search',
+        action='store_true',
+        help='find emails in the commits returned by commit search instead of scanning every repository'
+    )
+    user.add_argument(
+        '--fallback',
+        action='store_true',
+        help='with --fast or --search, scan every repository when they find no emails'
+    )
+    user.add_argument(
+        '--clone',
+        action='store_true',
+        help="find emails in local blobless clones instead of paging through commits with the API, "
+             "only commits authored with the user's public or noreply email are matched"
+    )
+    user.add_argument(
+        '--since',
+        action='store',
+        help='only scan commits after this ISO 8601 timestamp'
+    )
+    user.add_argument(
+        '--until',
+        action='store',
+        help='only scan commits before this ISO 8601 timestamp'
+    )
+    user.add_argument(
+        '--max-pages',
+        action='store',
+        type=int,
+        help='stop scanning a repository after this many pages of commits'
+    )
+    user.add_argument(
+        '--max-commits',
+        action='store',
+        type=int,
+        help='stop scanning a repository after this many commits'
+    )
+    user.add_argument(
+        '--max-stale-pages',
+        action='store',
+        type=int,
+        help='stop scanning a repository after this many pages without new emails'
+    )
+    user.add_argument(
+        '--skip-forks',
+        action='store_true',
+        help="don't scan forked repositories for emails"
+    )
+    user.add_argument(
+        '--skip-archived',
+        action='store_true',
+        help="don't scan archived repositories for emails"
+    )
+    user.add_argument(
+        '--prefilter',
+        action='store_true',
+        help="don't scan repositories that can't hold the user's commits, like empty ones"
+    )
+    user.add_argument(
+        '--queue-size',
+        action='store',
+        type=int,
+        default=scheduler.QUEUE_SIZE,
+        help='listed repositories waiting for a scan before listing pauses (default: %(default)s)'
+    )
+    user.add_argument(
+        '--scan-shared-history',
+        action='store_true',
+        help='keep scanning a repository after reaching commits already scanned in another repository'
+    )
+
+    serve = subparsers.add_parser('serve')
+    serve.add_argument(
+        '--host',
+        action='store',
+        default=server.DEFAULT_HOST,
+        help='address to listen on (default: %(default)s)'
+    )
+    serve.add_argument(
+        '--port',
+        action='store',
+        type=int,
+        default=server.DEFAULT_PORT,
+        help='port to listen on (default: %(default)s)'
+    )
 
     args = p.parse_args()
 
+    if args.resume and not args.checkpoint:
+        p.error('--resume requires --checkpoint')
+
     return args
 
 
@@ -273,7 +732,42 @@ def main():
         "user": user,
     }
 
-    ghapi = api.Api(args.oauth2_token)
+    response_cache = None
+    if args.cache_dir:
+        response_cache = cache.SqliteCache(args.cache_dir, ttl=args.cache_ttl)
+
+    requester = transport.get_requester(http2=args.http2)
+
+    memory_limit = None
+    if args.memory_limit:
+        memory_limit = args.memory_limit * 1024 * 1024
+
+    if args.command == "serve":
+        # Keep connections, cached responses and the rate limit budget warm
+        # between queries
+        ghapi = api.Api(
+            args.oauth2_token,
+            requester=requester,
+            cache=response_cache or cache.MemoryCache(ttl=args.cache_ttl),
+            wait_for_reset=args.wait_for_reset,
+            prefetch=args.prefetch,
+            memory_limit=memory_limit
+        )
+        server.serve(ghapi, dispatch, args.host, args.port)
+        return
+
+    ghapi = api.Api(
+        args.oauth2_token,
+        requester=requester,
+        cache=response_cache,
+        wait_for_reset=args.wait_for_reset,
+        prefetch=args.prefetch,
+        memory_limit=memory_limit
+    )
+
+    kwargs = vars(args)
+    if args.checkpoint:
+        kwargs['checkpoint'] = checkpoint.Checkpoint(args.checkpoint, resume=args.resume)
 
     outputters = {
         output.Stdout.name: output.Stdout,
@@ -281,8 +775,20 @@ def main():
     }
     outputter = outputters[args.output]()
 
+    profiler = None
+    if args.profile or args.profile_stacks or args.profile_cprofile:
+        profiler = profiling.Profiler(
+            stacks_path=args.profile_stacks,
+            cprofile_path=args.profile_cprofile
+        )
+        ghapi.profiler = profiler
+        outputter = profiling.TimedOutput(outputter, profiler)
+        profiler.start()
+
+    kwargs['profiler'] = profiler
+
     try:
-        dispatch[args.command](ghapi, outputter, **vars(args))
+        dispatch[args.command](ghapi, outputter, **kwargs)
     except api.ApiCallException as e:
         if e.rate_limiting:
             outputter.output({
@@ -304,6 +810,10 @@ def main():
         else:
             # Re-raise original exception
             raise
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.report()
 
 
 if __name__ == "__main__":
@@ -7,9 +7,70 @@ from __future__ import (
     unicode_literals,
 )
 
+import binascii
 import collections
+import functools
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from multiprocessing.pool import ThreadPool
+
+try:
+    # Python 3
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:
+    # Python 2
+    from urlparse import parse_qs, urlsplit
 
 from . import api
+from . import git
+from . import scheduler
+
+AUTHOR = 'author'
+COMMITTER = 'committer'
+CO_AUTHOR = 'co-author'
+
+# https://docs.github.com/en/pull-requests/committing-changes-to-your-project/creating-and-editing-commits/creating-a-commit-with-multiple-authors
+CO_AUTHORED_BY = re.compile(
+    r'^co-authored-by:\s*(.*?)\s*<([^>]*)>\s*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Commits made through the Github web interface are committed by Github itself
+WEB_FLOW_COMMITTER_EMAIL = 'noreply@github.com'
+
+# Concurrent profile requests when enriching organization members
+DEFAULT_MEMBER_WORKERS = 8
+
+
+def get_commit_identities(author_name, author_email, committer_name,
+                          committer_email, message):
+    """
+    Return the (name, email, source) identities found in a single commit
+    """
+    identities = {(author_name, author_email, AUTHOR)}
+
+    if committer_email != WEB_FLOW_COMMITTER_EMAIL:
+        identities.add((committer_name, committer_email, COMMITTER))
+
+    identities.update(
+        (name, email, CO_AUTHOR)
+        for name, email in CO_AUTHORED_BY.findall(message or '')
+    )
+
+    return identities
+
+
+def close_pages(paged):
+    # Stop a paginated call and its prefetching, lists used in place of one
+    # can't be closed
+    close = getattr(paged, 'close', None)
+    if close is not None:
+        close()
 
 
 def get_organization_information(ghapi, organization):
@@ -38,9 +99,14 @@ def get_organization_information(ghapi, organization):
     return human_readable_name_to_api_info
 
 
-def get_organization_repositories(ghapi, organization):
+def iter_organization_repositories(ghapi, organization, sort=None, direction=None):
+    """
+    Yield repositories one at a time, holding a single page in memory
+    """
     paged_organization_repositories = ghapi.get_organizations_public_repositories(
-        organization
+        organization,
+        sort=sort,
+        direction=direction
     )
 
     api_name_to_human_readable_name = [
@@ -56,19 +122,70 @@ def get_organization_repositories(ghapi, organization):
         ('pushed_at', 'Last Pushed'),
     ]
 
-    human_readable_name_to_api_info = [
-        collections.OrderedDict([
-            (human_readable_name, organization_repository[api_name])
-            for api_name, human_readable_name in api_name_to_human_readable_name
-        ])
-        for organization_repositories, _ in paged_organization_repositories
-        for organization_repository in organization_repositories
-    ]
+    try:
+        for organization_repository in paged_organization_repositories.items():
+            yield collections.OrderedDict([
+                (human_readable_name, organization_repository[api_name])
+                for api_name, human_readable_name in api_name_to_human_readable_name
+            ])
+    finally:
+        close_pages(paged_organization_repositories)
 
-    return human_readable_name_to_api_info
+
+def get_organization_repositories(ghapi, organization):
+    return list(iter_organization_repositories(ghapi, organization))
 
 
-def get_organization_members(ghapi, organization):
+def iter_changed_organization_repositories(ghapi, organization, previous):
+    """
+    Yield the repositories pushed to since previous, a mapping of repository
+    names to the records of an earlier listing
+
+    Repositories are listed most recently pushed first, so listing stops at
+    the first one unchanged since previous: the rest were pushed even
+    earlier.
+    """
+    organization_repositories = iter_organization_repositories(
+        ghapi,
+        organization,
+        sort='pushed',
+        direction='desc'
+    )
+
+    try:
+        for organization_repository in organization_repositories:
+            known = previous.get(organization_repository['Repository Name'])
+            if known is not None and known['Last Pushed'] == organization_repository['Last Pushed']:
+                break
+
+            yield organization_repository
+    finally:
+        organization_repositories.close()
+
+
+def get_organization_repositories_delta(ghapi, organization, snapshot):
+    """
+    Return every repository of an organization and the ones changed since
+    the snapshot, merging the changed ones into it
+
+    Only repositories that were pushed to are listed again, the others keep
+    the counts recorded when they were. Deleted repositories stay in the
+    snapshot.
+    """
+    changed = list(iter_changed_organization_repositories(
+        ghapi,
+        organization,
+        snapshot.get(organization)
+    ))
+    snapshot.update(organization, changed)
+
+    return list(snapshot.get(organization).values()), changed
+
+
+def iter_organization_members(ghapi, organization):
+    """
+    Yield members one at a time, holding a single page in memory
+    """
     paged_organization_members = ghapi.get_organizations_public_members(
         organization
     )
@@ -79,16 +196,54 @@ def get_organization_members(ghapi, organization):
         ('html_url', 'Github URL'),
     ]
 
-    human_readable_name_to_api_info = [
-        collections.OrderedDict([
-            (human_readable_name, organization_member[api_name])
-            for api_name, human_readable_name in api_name_to_human_readable_name
-        ])
-        for organization_members, _ in paged_organization_members
-        for organization_member in organization_members
-    ]
+    try:
+        for organization_member in paged_organization_members.items():
+            yield collections.OrderedDict([
+                (human_readable_name, organization_member[api_name])
+                for api_name, human_readable_name in api_name_to_human_readable_name
+            ])
+    finally:
+        close_pages(paged_organization_members)
 
-    return human_readable_name_to_api_info
+
+def get_organization_members(ghapi, organization):
+    return list(iter_organization_members(ghapi, organization))
+
+
+def get_members_detail(ghapi, members, workers=DEFAULT_MEMBER_WORKERS):
+    """
+    Merge each member's user profile into their member record
+
+    Profiles are fetched by a bounded pool of threads sharing ghapi, so they
+    also share its cache, connections and rate limit budget. Members whose
+    profile is gone are skipped.
+    """
+    pool = ThreadPool(processes=workers)
+    try:
+        users = pool.map(
+            functools.partial(scheduler.capture, functools.partial(get_user_information, ghapi)),
+            [member['Username'] for member in members]
+        )
+    finally:
+        pool.close()
+        pool.join()
+
+    members_detail = []
+    for member, user in zip(members, users):
+        # Deleted since the member listing
+        if isinstance(user, scheduler.Failure) and getattr(user.exception, 'not_found', False):
+            continue
+
+        members_detail.append(collections.OrderedDict(
+            list(member.items())
+            + [
+                (human_readable_name, api_info)
+                for human_readable_name, api_info in scheduler.unwrap(user).items()
+                if human_readable_name not in member
+            ]
+        ))
+
+    return members_detail
 
 
 def get_repository_information(ghapi, owner, repository):
@@ -120,7 +275,10 @@ def get_repository_information(ghapi, owner, repository):
     return human_readable_name_to_api_info
 
 
-def get_repository_contributors(ghapi, owner, repository):
+def iter_repository_contributors(ghapi, owner, repository):
+    """
+    Yield contributors one at a time, holding a single page in memory
+    """
     paged_repository_contributors = ghapi.get_repository_contributors(
         owner,
         repository
@@ -131,16 +289,71 @@ def get_repository_contributors(ghapi, owner, repository):
         ('contributions', 'Contributions'),
     ]
 
-    human_readable_name_to_api_info = [
-        collections.OrderedDict([
-            (human_readable_name, repository_contributor[api_name])
-            for api_name, human_readable_name in api_name_to_human_readable_name
-        ])
-        for repository_contributors, _ in paged_repository_contributors
-        for repository_contributor in repository_contributors
+    try:
+        for repository_contributor in paged_repository_contributors.items():
+            yield collections.OrderedDict([
+                (human_readable_name, repository_contributor[api_name])
+                for api_name, human_readable_name in api_name_to_human_readable_name
+            ])
+    finally:
+        close_pages(paged_repository_contributors)
+
+
+def get_repository_contributors(ghapi, owner, repository):
+    return list(iter_repository_contributors(ghapi, owner, repository))
+
+
+def iter_contributor_statistics(ghapi, repositories):
+    """
+    Yield ((owner, repository), statistics) as the contributor statistics of
+    each repository become ready, in no particular order
+
+    statistics maps usernames to their commits, additions and deletions, or
+    is None when Github didn't finish computing them in time.
+    """
+    calls = [
+        (
+            (owner, repository),
+            functools.partial(ghapi.get_repository_contributor_statistics, owner, repository),
+        )
+        for owner, repository in repositories
     ]
 
-    return human_readable_name_to_api_info
+    for key, contributors in scheduler.poll(calls):
+        if contributors is None:
+            yield (key, None)
+            continue
+
+        statistics = {}
+        for contributor in contributors:
+            login = (contributor.get('author') or {}).get('login')
+            if login is None:
+                continue
+
+            weeks = contributor.get('weeks') or []
+            statistics[login] = collections.OrderedDict([
+                ('Commits', contributor.get('total', 0)),
+                ('Additions', sum(week.get('a', 0) for week in weeks)),
+                ('Deletions', sum(week.get('d', 0) for week in weeks)),
+            ])
+
+        yield (key, statistics)
+
+
+def get_repository_contributor_statistics(ghapi, owner, repository):
+    for _, statistics in iter_contributor_statistics(ghapi, [(owner, repository)]):
+        return statistics
+
+
+def add_contributor_statistics(contributors, statistics):
+    """
+    Add the commits, additions and deletions in statistics to the
+    contributors they belong to
+    """
+    for contributor in contributors:
+        contributor.update((statistics or {}).get(contributor['Username']) or {})
+
+    return contributors
 
 
 def get_user_information(ghapi, username):
@@ -168,7 +381,10 @@ def get_user_information(ghapi, username):
     return human_readable_name_to_api_info
 
 
-def get_user_organizations(ghapi, username):
+def iter_user_organizations(ghapi, username):
+    """
+    Yield organizations one at a time, holding a single page in memory
+    """
     paged_user_organizations = ghapi.get_users_public_organizations(
         username
     )
@@ -177,19 +393,24 @@ def get_user_organizations(ghapi, username):
         ('login', 'Organization'),
     ]
 
-    human_readable_name_to_api_info = [
-        collections.OrderedDict([
-            (human_readable_name, user_organization[api_name])
-            for api_name, human_readable_name in api_name_to_human_readable_name
-        ])
-        for user_organizations, _ in paged_user_organizations
-        for user_organization in user_organizations
-    ]
+    try:
+        for user_organization in paged_user_organizations.items():
+            yield collections.OrderedDict([
+                (human_readable_name, user_organization[api_name])
+                for api_name, human_readable_name in api_name_to_human_readable_name
+            ])
+    finally:
+        close_pages(paged_user_organizations)
 
-    return human_readable_name_to_api_info
+
+def get_user_organizations(ghapi, username):
+    return list(iter_user_organizations(ghapi, username))
 
 
-def get_user_repositories(ghapi, username):
+def iter_user_repositories(ghapi, username):
+    """
+    Yield a list of repositories for each page as it arrives
+    """
     # TODO: Change this back to type_='all' and find a good way to grab
     # the correct repository owners
     paged_user_repositories = ghapi.get_users_public_repositories(
@@ -204,25 +425,363 @@ def get_user_repositories(ghapi, username):
         ('description', 'Description'),
         ('html_url', 'Github URL'),
         ('clone_url', 'Clone URL'),
+        ('size', 'Size'),
+        ('fork', 'Fork'),
+        ('archived', 'Archived'),
+        ('forks_count', 'Forks'),
+        ('created_at', 'Created'),
+        ('pushed_at', 'Last Pushed'),
     ]
 
+    try:
+        for user_repositories, _ in paged_user_repositories:
+            yield [
+                collections.OrderedDict([
+                    (human_readable_name, user_repository[api_name])
+                    for api_name, human_readable_name in api_name_to_human_readable_name
+                ])
+                for user_repository in user_repositories
+            ]
+    finally:
+        close_pages(paged_user_repositories)
+
+
+def get_user_repositories(ghapi, username):
     human_readable_name_to_api_info = [
-        collections.OrderedDict([
-            (human_readable_name, user_repository[api_name])
-            for api_name, human_readable_name in api_name_to_human_readable_name
-        ])
-        for user_repositories, _ in paged_user_repositories
+        user_repository
+        for user_repositories in iter_user_repositories(ghapi, username)
         for user_repository in user_repositories
     ]
 
     return human_readable_name_to_api_info
 
 
-def get_repository_commit_emails(ghapi, owner, repository, author=None):
+def get_event_emails(paged_events):
+    """
+    Return the (name, email, source) identities of the commits pushed in
+    paginated events
+
+    Push events only carry commit authors, not committers.
+    """
+    event_emails = set()
+
+    try:
+        for event in paged_events.items():
+            if event.get('type') != 'PushEvent':
+                continue
+
+            for commit in (event.get('payload') or {}).get('commits') or []:
+                author = commit.get('author') or {}
+                event_emails.add((author.get('name'), author.get('email'), AUTHOR))
+                event_emails.update(
+                    (name, email, CO_AUTHOR)
+                    for name, email in CO_AUTHORED_BY.findall(commit.get('message') or '')
+                )
+    except api.ApiCallException as e:
+        # Paging past the last available event is refused
+        if not e.unprocessable_entity:
+            raise
+    finally:
+        close_pages(paged_events)
+
+    return event_emails
+
+
+def get_user_event_emails(ghapi, username):
+    return get_event_emails(ghapi.get_users_public_events(username))
+
+
+def get_organization_event_emails(ghapi, organization):
+    return get_event_emails(ghapi.get_organizations_public_events(organization))
+
+
+def get_user_search_emails(ghapi, username, budget=None):
+    """
+    Return the (name, email, source) identities of a user's commits found
+    through commit search instead of scanning each repository
+
+    Search spends its own rate limit and only reaches the first 1000 results.
+    max_stale_pages of the budget doesn't apply.
+    """
+    if budget is None:
+        budget = CommitBudget()
+
+    query = ['author:{}'.format(username)]
+    if budget.since:
+        query.append('author-date:>={}'.format(budget.since))
+    if budget.until:
+        query.append('author-date:<={}'.format(budget.until))
+
+    paged_results = ghapi.search_commits(' '.join(query), sort='author-date')
+
+    search_emails = set()
+    shas = set()
+    pages = commits = 0
+
+    try:
+        for result, _ in paged_results:
+            for item in result.get('items') or []:
+                if budget.commits_exhausted(commits):
+                    break
+
+                # The same commit is returned once per fork holding it
+                if item['sha'] in shas:
+                    continue
+                shas.add(item['sha'])
+
+                commits += 1
+                search_emails.update(get_commit_identities(
+                    item['commit']['author']['name'],
+                    item['commit']['author']['email'],
+                    item['commit']['committer']['name'],
+                    item['commit']['committer']['email'],
+                    item['commit']['message'],
+                ))
+
+            pages += 1
+            if budget.exhausted(pages, commits, 0):
+                break
+    except api.ApiCallException as e:
+        # Paging past the first 1000 results is refused
+        if not e.unprocessable_entity:
+            raise
+    finally:
+        close_pages(paged_results)
+
+    return search_emails
+
+
+def is_repository_contributor(ghapi, owner, repository, username):
+    """
+    Return whether username is a contributor to a repository, or None when
+    the first page of contributors can't tell
+    """
+    paged_repository_contributors = ghapi.get_repository_contributors(
+        owner,
+        repository
+    )
+
+    try:
+        for repository_contributors, _ in paged_repository_contributors:
+            if any(
+                (repository_contributor.get('login') or '').lower() == username.lower()
+                for repository_contributor in repository_contributors
+            ):
+                return True
+
+            # Contributors come most active first, a later page could still
+            # hold the user
+            links = getattr(paged_repository_contributors, 'links', {})
+            return None if links.get('next') else False
+
+        return False
+    except (api.ApiCallException, ValueError):
+        # Empty repositories and those with too many contributors to list
+        return None
+    finally:
+        close_pages(paged_repository_contributors)
+
+
+class Prefilter(object):
+    """
+    Drop repositories that can't hold commits by a user before scanning them
+
+    Empty repositories are dropped from the listing alone. Forks are kept
+    even when they were never pushed to, they hold their parent's history
+    and the user's commits in it. With ghapi, repositories
+    whose contributors conclusively don't include the user are dropped too,
+    which costs a request per repository and is only worth it when it saves
+    something more expensive, like a clone.
+    """
+
+    def __init__(self, username, ghapi=None):
+        self.username = username
+        self.ghapi = ghapi
+        self.skipped = 0
+
+    @staticmethod
+    def empty(repository):
+        return repository.get('Size') == 0
+
+    def __call__(self, repository):
+        """
+        Return whether repository should be scanned
+        """
+        keep = not self.empty(repository)
+
+        if keep and self.ghapi is not None:
+            keep = is_repository_contributor(
+                self.ghapi,
+                self.username,
+                repository['Repository Name'],
+                self.username
+            ) is not False
+
+        if not keep:
+            self.skipped += 1
+
+        return keep
+
+
+class CommitBudget(object):
+    """
+    Limits on how much of a repository's history a commit scan may cover
+
+    since and until are ISO 8601 timestamps bounding the commit dates. The
+    scan stops after max_pages pages, after max_commits commits or once
+    max_stale_pages consecutive pages have found no new identities.
+    """
+
+    def __init__(self, since=None, until=None, max_pages=None, max_commits=None,
+                 max_stale_pages=None):
+        self.since = since
+        self.until = until
+        self.max_pages = max_pages
+        self.max_commits = max_commits
+        self.max_stale_pages = max_stale_pages
+
+    def commits_exhausted(self, commits):
+        return self.max_commits is not None and commits >= self.max_commits
+
+    def exhausted(self, pages, commits, stale_pages):
+        return (
+            (self.max_pages is not None and pages >= self.max_pages)
+            or self.commits_exhausted(commits)
+            or (self.max_stale_pages is not None and stale_pages >= self.max_stale_pages)
+        )
+
+    def key(self):
+        """
+        Return a string telling budgets apart, for keying the results scanned
+        under them
+        """
+        return ",".join(
+            "" if value is None else str(value)
+            for value in [self.since, self.until, self.max_pages, self.max_commits,
+                          self.max_stale_pages]
+        )
+
+
+# The SeenCommits of this process by token, see SeenCommits.__reduce__
+_seen_commits = {}
+
+
+def _get_seen_commits(token):
+    seen = _seen_commits.get(token)
+    if seen is None:
+        seen = SeenCommits(token)
+    return seen
+
+
+class SeenCommits(object):
+    """
+    The SHAs of every commit scanned so far in a run, kept as 20 byte digests
+
+    Forks share their parent's history, so once a whole page of a
+    repository's commits was seen before, so was the rest of its history.
+
+    Pickling only carries a token, each process keeps one tracker per token
+    across all the tasks it runs. Pool workers forked after the tracker was
+    created share its count of saved requests.
+    """
+
+    def __init__(self, token=None):
+        self.token = token or uuid.uuid4().hex
+        self.digests = set()
+        self.lock = threading.Lock()
+        self.saved = multiprocessing.Value('l', 0)
+        _seen_commits[self.token] = self
+
+    def __reduce__(self):
+        return (_get_seen_commits, (self.token,))
+
+    def all_seen(self, shas):
+        """
+        Return whether every one of shas was seen before
+        """
+        digests = {binascii.unhexlify(sha) for sha in shas}
+
+        with self.lock:
+            return bool(digests) and digests <= self.digests
+
+    def add(self, shas):
+        """
+        Record shas as seen
+        """
+        digests = {binascii.unhexlify(sha) for sha in shas}
+
+        with self.lock:
+            self.digests.update(digests)
+
+    def save(self, requests):
+        with self.saved.get_lock():
+            self.saved.value += requests
+
+    @property
+    def saved_requests(self):
+        return self.saved.value
+
+    def close(self):
+        _seen_commits.pop(self.token, None)
+
+
+def remaining_pages(links, pages):
+    """
+    Return how many pages follow the current one according to its last link
+    """
+    last_url = links.get('last', {}).get('url')
+    if last_url is None:
+        return 0
+
+    last_page = parse_qs(urlsplit(last_url).query).get('page', [None])[0]
+    try:
+        return max(int(last_page) - pages, 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def commit_emails_key(source, author, budget):
+    # A scan under one budget doesn't answer for another
+    return "commit-emails/{}/{}/{}".format(source, author or "", budget.key())
+
+
+def get_repository_commit_emails(ghapi, owner, repository, author=None, budget=None,
+                                 checkpoint=None, seen=None):
+    """
+    With seen, stop once a page holds only commits scanned earlier in the run
+    """
+    if budget is None:
+        budget = CommitBudget()
+
+    repository_commit_emails = set()
+    pages = commits = stale_pages = 0
+    cursor = api.Cursor()
+
+    if checkpoint is not None:
+        key = commit_emails_key("{}/{}".format(owner, repository), author, budget)
+
+        completed = checkpoint.get(key)
+        if completed is not None:
+            return {tuple(identity) for identity in completed}
+
+        cursor.url, state = checkpoint.get_cursor(key)
+        if state is not None:
+            repository_commit_emails = {tuple(identity) for identity in state['emails']}
+            pages, commits, stale_pages = state['pages'], state['commits'], state['stale_pages']
+
+    # Don't prefetch pages past the budget that would never be scanned
+    max_pages = None
+    if budget.max_pages is not None:
+        max_pages = max(budget.max_pages - pages, 0)
+
     paged_repository_commits = ghapi.get_repository_commits(
         owner,
         repository,
-        author=author
+        author=author,
+        since=budget.since,
+        until=budget.until,
+        cursor=cursor,
+        max_pages=max_pages
     )
 
     # https://developer.github.com/v3/git/
@@ -237,13 +796,140 @@ def get_repository_commit_emails(ghapi, owner, repository, author=None):
                 # Re-raise original exception
                 raise
 
-    repository_commit_emails = {
-        (
-            repository_commit['commit']['author']['name'],
-            repository_commit['commit']['author']['email'],
-        )
-        for repository_commits, _ in get_commits_or_empty(paged_repository_commits)
-        for repository_commit in repository_commits
-    }
+    try:
+        for repository_commits, _ in get_commits_or_empty(paged_repository_commits):
+            if seen is not None and seen.all_seen(
+                repository_commit['sha']
+                for repository_commit in repository_commits
+                if repository_commit.get('sha')
+            ):
+                # Count the pages after this one that won't be requested,
+                # prefetched ones already were
+                saved = remaining_pages(getattr(paged_repository_commits, 'links', {}), pages + 1)
+                if budget.max_pages is not None:
+                    saved = min(saved, max(budget.max_pages - pages - 1, 0))
+                seen.save(max(saved - getattr(paged_repository_commits, 'ahead', 0), 0))
+                break
+
+            identities = len(repository_commit_emails)
+            scanned = []
+
+            for repository_commit in repository_commits:
+                if budget.commits_exhausted(commits):
+                    break
+
+                commits += 1
+                repository_commit_emails.update(get_commit_identities(
+                    repository_commit['commit']['author']['name'],
+                    repository_commit['commit']['author']['email'],
+                    repository_commit['commit']['committer']['name'],
+                    repository_commit['commit']['committer']['email'],
+                    repository_commit['commit']['message'],
+                ))
+                scanned.append(repository_commit)
+
+            if seen is not None:
+                # Commits past max_commits weren't scanned, a fork holding
+                # them still has to
+                seen.add(
+                    repository_commit['sha']
+                    for repository_commit in scanned
+                    if repository_commit.get('sha')
+                )
+
+            pages += 1
+            if len(repository_commit_emails) > identities:
+                stale_pages = 0
+            else:
+                stale_pages += 1
+
+            if budget.exhausted(pages, commits, stale_pages):
+                break
+
+            if checkpoint is not None and cursor.url:
+                checkpoint.set_cursor(key, cursor.url, {
+                    'emails': sorted(repository_commit_emails),
+                    'pages': pages,
+                    'commits': commits,
+                    'stale_pages': stale_pages,
+                })
+    finally:
+        close_pages(paged_repository_commits)
+
+    if checkpoint is not None:
+        checkpoint.set(key, sorted(repository_commit_emails))
+
+    return repository_commit_emails
+
+
+def get_user_author_emails(ghapi, username):
+    """
+    Return the emails a user's commits are known to be authored with
+
+    These are the public profile email and the noreply addresses Github
+    gives every account. The private emails Github also attributes commits
+    by aren't available.
+    """
+    user_info, _ = ghapi.get_user(
+        username
+    )
+
+    # https://docs.github.com/en/account-and-profile/setting-up-and-managing-your-personal-account-on-github/managing-email-preferences/setting-your-commit-email-address
+    author_emails = [
+        '{}+{}@users.noreply.github.com'.format(user_info['id'], user_info['login']),
+        '{}@users.noreply.github.com'.format(user_info['login']),
+    ]
+
+    if user_info.get('email'):
+        author_emails.append(user_info['email'])
+
+    return author_emails
+
+
+def get_repository_commit_emails_from_clone(clone_url, author_emails=None, budget=None,
+                                            checkpoint=None):
+    """
+    Collect the same emails as get_repository_commit_emails from a local
+    clone instead of paging through the API
+
+    A clone knows nothing of Github accounts, so instead of an author the
+    commits are filtered to author_emails, see get_user_author_emails.
+    Commits the API attributes to the user through a private email are
+    missed. Only the date window and max_commits of the budget apply, there
+    are no pages to count.
+    """
+    if budget is None:
+        budget = CommitBudget()
+
+    if checkpoint is not None:
+        key = commit_emails_key(clone_url, ','.join(sorted(author_emails or [])), budget)
+
+        completed = checkpoint.get(key)
+        if completed is not None:
+            return {tuple(identity) for identity in completed}
+
+    directory = tempfile.mkdtemp()
+
+    try:
+        repository_directory = os.path.join(directory, "repository.git")
+        git.clone(clone_url, repository_directory)
+
+        repository_commit_emails = {
+            identity
+            for commit in git.log(
+                repository_directory,
+                ["%an", "%ae", "%cn", "%ce", "%B"],
+                author_emails=author_emails,
+                since=budget.since,
+                until=budget.until,
+                max_count=budget.max_commits
+            )
+            for identity in get_commit_identities(*commit)
+        }
+    finally:
+        shutil.rmtree(directory)
+
+    if checkpoint is not None:
+        checkpoint.set(key, sorted(repository_commit_emails))
 
     return repository_commit_emails
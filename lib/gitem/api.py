@@ -7,11 +7,37 @@ from __future__ import (
     unicode_literals,
 )
 
+import contextlib
 import functools
+import hashlib
 import json
+import threading
+import time
+
+try:
+    # Python 3
+    from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+except ImportError:
+    # Python 2
+    from urllib import urlencode
+    from urlparse import parse_qsl, urlsplit, urlunsplit
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
 
 import requests
 
+from . import cache as cache_
+from . import codec
+from . import coalesce
+from . import pipeline
+from . import profiling
+from . import transport
+
 
 class AuthenticationRequiredException(BaseException):
     pass
@@ -60,45 +86,569 @@ class ApiCallException(BaseException):
         return "{}: {}".format(self.code, json.dumps(self.message))
 
 
+def request_key(method, url, params, token=None):
+    """
+    Return a canonical key identifying a request
+
+    Query parameters from the URL and params are merged and sorted so the
+    same resource always has the same key. The key doesn't depend on the
+    token used to authenticate unless token is given, for responses that are
+    specific to a token.
+    """
+    scheme, netloc, path, query, _ = urlsplit(url)
+
+    query = set(parse_qsl(query, keep_blank_values=True))
+    query.update(
+        (name, "{}".format(value))
+        for name, value in params.items()
+    )
+
+    key = "{} {}".format(
+        method.upper(),
+        urlunsplit((scheme, netloc, path, urlencode(sorted(query)), "")),
+    )
+
+    if token is not None:
+        # Don't leak the token itself into keys that may be persisted
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        key += " token:{}".format(digest[:16])
+
+    return key
+
+
+def is_public(response):
+    """
+    Return whether a response may be shared regardless of who requested it
+
+    https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Cache-Control
+    """
+    directives = (response.headers.get("Cache-Control") or "").split(",")
+
+    return "public" in [directive.strip().lower() for directive in directives]
+
+
+def _header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limiting_exception():
+    return ApiCallException(requests.codes.FORBIDDEN, {
+        "message": "API rate limit exceeded",
+        "documentation_url": ApiCallException.rate_limiting_url,
+    })
+
+
 def oauth2_required(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if not args or getattr(args[0], "oauth2_token", None) is None:
             raise AuthenticationRequiredException("Please include an OAuth2 token.")
-        return func(*args, **kwargs)
+        with args[0].authenticated():
+            return func(*args, **kwargs)
     return wrapper
 
 
+# Rate limit resources, each with its own budget
+# https://developer.github.com/v3/rate_limit/
+CORE = "core"
+SEARCH = "search"
+
+
+def url_resource(url):
+    """
+    Return the rate limit resource a request to url counts against
+    """
+    path = urlsplit(url).path
+    return SEARCH if path.startswith("/search/") else CORE
+
+
+class TokenPool(object):
+    """
+    Track the rate limit budget of each token and hand out the token with the
+    most headroom
+
+    https://developer.github.com/v3/#rate-limiting
+    """
+
+    # Hourly limits before a response tells us otherwise
+    AUTHENTICATED_LIMIT = 5000
+    UNAUTHENTICATED_LIMIT = 60
+
+    # How long to pull a token out when GitHub doesn't say when it resets
+    DEFAULT_BACKOFF = 60
+
+    def __init__(self, tokens=None, clock=time.time, sleep=time.sleep, wait=False,
+                 authenticated_limit=None, unauthenticated_limit=None):
+        """
+        With wait, acquire blocks until a token resets instead of raising
+        once every token is exhausted. The limits default to those of the
+        core resource.
+        """
+        if authenticated_limit is not None:
+            self.AUTHENTICATED_LIMIT = authenticated_limit
+        if unauthenticated_limit is not None:
+            self.UNAUTHENTICATED_LIMIT = unauthenticated_limit
+
+        self.tokens = list(tokens or []) or [None]
+        self.clock = clock
+        self.sleep = sleep
+        self.wait = wait
+        self.lock = threading.Lock()
+        self.budgets = {
+            token: {"remaining": None, "reset": None}
+            for token in self.tokens
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def headroom(self, token, now):
+        budget = self.budgets[token]
+
+        if budget["remaining"] is None or (
+            budget["reset"] is not None and budget["reset"] <= now
+        ):
+            if token is None:
+                return self.UNAUTHENTICATED_LIMIT
+            return self.AUTHENTICATED_LIMIT
+
+        return budget["remaining"]
+
+    def acquire(self, token=None):
+        """
+        Reserve a request against the token with the most headroom, or against
+        a specific token
+        """
+        while True:
+            with self.lock:
+                now = self.clock()
+                candidates = [token] if token is not None else self.tokens
+                best = max(candidates, key=lambda candidate: self.headroom(candidate, now))
+                headroom = self.headroom(best, now)
+
+                if headroom > 0:
+                    # Count the request against the budget before the response
+                    # tells us the real value so concurrent callers spread
+                    # across tokens
+                    self.budgets[best]["remaining"] = headroom - 1
+                    return best
+
+                if not self.wait:
+                    raise rate_limiting_exception()
+
+                resets = [
+                    self.budgets[candidate]["reset"]
+                    for candidate in candidates
+                    if self.budgets[candidate]["reset"] is not None
+                ]
+                delay = min(resets) - now if resets else self.DEFAULT_BACKOFF
+
+            # Sleep outside the lock so responses can still update budgets
+            self.sleep(max(delay, 0) + 1)
+
+    def update(self, token, remaining, reset):
+        with self.lock:
+            self.budgets[token] = {"remaining": remaining, "reset": reset}
+
+    def exhaust(self, token, reset=None):
+        if reset is None or reset <= self.clock():
+            reset = self.clock() + self.DEFAULT_BACKOFF
+        self.update(token, 0, reset)
+
+    @property
+    def remaining(self):
+        now = self.clock()
+        return sum(self.headroom(token, now) for token in self.tokens)
+
+    @property
+    def reset(self):
+        resets = [
+            budget["reset"]
+            for budget in self.budgets.values()
+            if budget["reset"] is not None
+        ]
+        return min(resets) if resets else None
+
+
+class Cursor(object):
+    """
+    The URL of the next page of a paginated call, None once it's exhausted
+    """
+
+    def __init__(self, url=None):
+        self.url = url
+
+
+class PageIterator(object):
+    """
+    Iterate over the (json, status_code) pages of a paginated call
+
+    With prefetch, a background thread requests up to that many following
+    pages while the caller works on the current one. The cursor and links
+    always describe the page most recently returned, not the prefetched ones.
+    No more than max_pages pages are requested, prefetched or not.
+    """
+
+    def __init__(self, ghapi, method, url, params, cursor=None, prefetch=0, max_pages=None):
+        self.ghapi = ghapi
+        self.method = method
+        self.url = url
+        self.params = params
+        self.cursor = cursor
+        self.prefetch = prefetch
+        self.max_pages = max_pages
+        self.requested = 0
+        self.returned = 0
+        self.links = {}
+        self.closed = threading.Event()
+        self.pages = None
+        self.thread = None
+
+        # Pages are requested later, possibly by another thread, so remember
+        # whether the call was pinned to the first token
+        self.pinned = getattr(ghapi.local, "authenticated", False)
+
+    def __iter__(self):
+        return self
+
+    @property
+    def ahead(self):
+        """
+        The number of pages requested but not yet returned
+        """
+        return self.requested - self.returned
+
+    def more(self):
+        return bool(self.url) and (self.max_pages is None or self.requested < self.max_pages)
+
+    def fetch(self):
+        """
+        Request the page at url and advance url to the next page
+        """
+        if self.pinned:
+            with self.ghapi.authenticated():
+                response = self.ghapi.call(self.method, self.url, self.params)
+        else:
+            response = self.ghapi.call(self.method, self.url, self.params)
+
+        self.requested += 1
+        links = response.links
+
+        # The next link already carries the query parameters
+        self.params = {}
+        self.url = links.get("next", {}).get("url")
+
+        return (response.content, response.status_code, links)
+
+    def prefetch_pages(self):
+        try:
+            while self.more() and not self.closed.is_set():
+                page = self.fetch()
+                # Hold the page against the memory shared by every prefetching
+                # iterator until the caller takes it. An iterator whose caller
+                # has taken every page goes ahead regardless, the pages held
+                # by others may be waiting on this caller.
+                self.ghapi.memory.acquire(len(page[0]), owner=id(self))
+                self.pages.put((page, None))
+        except BaseException as e:
+            self.pages.put((None, e))
+        else:
+            self.pages.put((None, None))
+
+        if self.closed.is_set():
+            # close may have drained the queue before the last put
+            self.drain()
+
+    def drain(self):
+        while True:
+            try:
+                page, _ = self.pages.get_nowait()
+            except queue.Empty:
+                return
+
+            if page is not None:
+                self.ghapi.memory.release(len(page[0]), owner=id(self))
+
+    def __next__(self):
+        if self.closed.is_set():
+            raise StopIteration
+
+        if not self.prefetch:
+            if not self.more():
+                raise StopIteration
+            page = self.fetch()
+        else:
+            if self.pages is None:
+                self.pages = queue.Queue(maxsize=self.prefetch)
+                self.thread = threading.Thread(target=self.prefetch_pages)
+                self.thread.daemon = True
+                self.thread.start()
+
+            page, exception = self.pages.get()
+            if page is not None:
+                self.ghapi.memory.release(len(page[0]), owner=id(self))
+            else:
+                # The prefetching thread has put its last item and exited,
+                # waiting on the queue again would never return
+                self.closed.set()
+            if exception is not None:
+                raise exception
+            if page is None:
+                raise StopIteration
+
+        self.returned += 1
+        content, status_code, self.links = page
+        if self.cursor is not None:
+            self.cursor.url = self.links.get("next", {}).get("url")
+
+        with profiling.timer(self.ghapi.profiler, "decode"):
+            result = codec.loads(content)
+
+        return (result, status_code)
+
+    # Python 2
+    next = __next__
+
+    def items(self):
+        """
+        Yield the items of every page in turn
+        """
+        for result, _ in self:
+            for item in result:
+                yield item
+
+    def close(self):
+        """
+        Stop iterating and prefetching
+        """
+        self.closed.set()
+
+        # Unblock the prefetching thread if it's waiting on a full queue
+        if self.pages is not None:
+            self.drain()
+
+
 class Api(object):
 
     BASE_URL = "https://api.github.com"
 
-    def __init__(self, oauth2_token=None, requester=requests.request):
-        self.oauth2_token = oauth2_token
+    def __init__(self, oauth2_token=None, requester=requests.request, cache=None,
+                 wait_for_reset=False, prefetch=0, memory_limit=None):
+        """
+        oauth2_token may be a single token or a list of tokens, requests are
+        spread across the tokens according to their remaining rate limit.
+        Endpoints requiring authentication always use the first token.
+
+        With wait_for_reset, calls wait for the rate limit to reset instead
+        of raising once it runs out. prefetch is how many pages paginated
+        calls request ahead of the caller, memory_limit caps the bytes held
+        by all prefetched pages together.
+        """
+        if isinstance(oauth2_token, (list, tuple)):
+            tokens = [token for token in oauth2_token if token]
+        else:
+            tokens = [oauth2_token] if oauth2_token else []
+
+        self.oauth2_token = tokens[0] if tokens else None
+        self.tokens = TokenPool(tokens, wait=wait_for_reset)
+        # Search has a separate, much smaller, per minute budget
+        # https://developer.github.com/v3/search/#rate-limit
+        self.search_tokens = TokenPool(
+            tokens,
+            wait=wait_for_reset,
+            authenticated_limit=30,
+            unauthenticated_limit=10
+        )
+        self.prefetch = prefetch
+        self.memory = pipeline.MemoryBudget(memory_limit)
         self.requester = requester
+        self.cache = cache
+        self.flights = coalesce.SingleFlight()
+        self.local = threading.local()
+        self.profiler = None
 
         # https://developer.github.com/v3/media/#request-specific-version
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
+            "Accept-Encoding": transport.ACCEPT_ENCODING,
         }
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["local"]
+        # Timings are only collected in the process that owns the profiler
+        state["profiler"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def authenticated(self):
+        """
+        Pin calls made by this thread within the context to the first token
+        """
+        previous = getattr(self.local, "authenticated", False)
+        self.local.authenticated = True
+        try:
+            yield
+        finally:
+            self.local.authenticated = previous
+
+    @property
+    def rate_limit_remaining(self):
+        return self.tokens.remaining
+
+    @property
+    def rate_limit_reset(self):
+        return self.tokens.reset
+
     def call(self, method, url, params=None):
         """
         Make a Github developer API call
+
+        Concurrent identical GET requests share a single in-flight request.
         """
         if params is None:
             params = {}
 
-        if self.oauth2_token:
-            params["access_token"] = self.oauth2_token
+        if method != "GET":
+            return self.uncached_call(method, url, params)
+
+        pinned = getattr(self.local, "authenticated", False)
+        key = request_key(method, url, params, self.oauth2_token if pinned else None)
+
+        return self.flights.do(key, self.cached_call, key, method, url, params)
+
+    def cached_call(self, key, method, url, params):
+        """
+        Return a cached response, or make the call and cache its response
+
+        Responses Github doesn't mark public depend on the token that made
+        the call, like private repositories in a listing. They're cached
+        under a key scoped to that token, only readable by calls that could
+        have been made with it: any of the Api's tokens, or only the first
+        token for calls pinned to it.
+        """
+        shared_key = request_key(method, url, params)
+
+        if self.cache is not None:
+            if getattr(self.local, "authenticated", False):
+                tokens = [self.oauth2_token]
+            else:
+                tokens = self.token_pool(url_resource(url)).tokens
+
+            keys = [shared_key] + [
+                request_key(method, url, params, token)
+                for token in tokens
+                if token is not None
+            ]
+
+            for candidate in keys:
+                record = self.cache.get(candidate)
+                if record is not None:
+                    return cache_.load_response(record)
+
+        response, token = self.token_call(method, url, params)
+
+        # An accepted request is still being computed, polling it again has
+        # to reach Github
+        if self.cache is not None and response.status_code != requests.codes.ACCEPTED:
+            if token is None or is_public(response):
+                key = shared_key
+            else:
+                key = request_key(method, url, params, token)
+
+            self.cache.set(key, cache_.dump_response(response))
+
+        return response
 
-        response = self.requester(method, url, params=params, headers=self.headers)
+    def token_pool(self, resource):
+        return self.search_tokens if resource == SEARCH else self.tokens
 
-        if not response.ok:
-            raise ApiCallException(response.status_code, response.json())
+    def uncached_call(self, method, url, params):
+        response, _ = self.token_call(method, url, params)
 
         return response
 
+    def token_call(self, method, url, params):
+        """
+        Make a call, rotating tokens while they're rate limited, and return
+        the response with the token that made it
+        """
+        pinned = getattr(self.local, "authenticated", False)
+        resource = url_resource(url)
+        tokens = self.token_pool(resource)
+
+        while True:
+            token = tokens.acquire(self.oauth2_token if pinned else None)
+
+            # https://developer.github.com/v3/#oauth2-token-sent-in-a-header
+            headers = dict(self.headers)
+            if token:
+                headers["Authorization"] = "token {}".format(token)
+
+            with profiling.timer(self.profiler, "fetch"):
+                response = self.requester(method, url, params=params, headers=headers)
+
+            self.update_rate_limit(token, response, resource)
+
+            if response.ok:
+                break
+
+            exception = ApiCallException(response.status_code, codec.loads(response.content))
+            if not exception.rate_limiting:
+                raise exception
+
+            # Pull the token out until it resets and retry with the next
+            # token that still has headroom
+            tokens.exhaust(
+                token,
+                _header_int(response.headers, "X-RateLimit-Reset")
+            )
+
+        # Read the body before sharing the response between callers so they
+        # don't race each other consuming the underlying stream
+        response.content
+        self.count_transfer(response)
+
+        return response, token
+
+    def count_transfer(self, response):
+        """
+        Count the bytes of a response body as transferred and decompressed
+        """
+        if self.profiler is None:
+            return
+
+        decompressed = len(response.content)
+        transferred = transport.transferred_bytes(response)
+
+        self.profiler.count("bytes transferred", decompressed if transferred is None else transferred)
+        self.profiler.count("bytes decompressed", decompressed)
+
+    def update_rate_limit(self, token, response, resource=CORE):
+        """
+        Record the rate limit budget reported by a response against the
+        resource it names, or the resource of its request
+        """
+        remaining = _header_int(response.headers, "X-RateLimit-Remaining")
+        reset = _header_int(response.headers, "X-RateLimit-Reset")
+        resource = response.headers.get("X-RateLimit-Resource") or resource
+
+        if remaining is not None and reset is not None:
+            self.token_pool(resource).update(token, remaining, reset)
+
     def json_call(self, method, endpoint, params=None):
         """
         Return JSON data from a Github developer API call
@@ -109,28 +659,64 @@ class Api(object):
         url = self.BASE_URL + endpoint
         response = self.call(method, url, params)
 
-        return (response.json(), response.status_code)
+        with profiling.timer(self.profiler, "decode"):
+            result = codec.loads(response.content)
+
+        return (result, response.status_code)
 
-    def paginated_json_call(self, method, endpoint, params=None):
+    def paginated_json_call(self, method, endpoint, params=None, cursor=None, max_pages=None):
         """
-        Return paginated JSON data from a Github developer API call
+        Return a PageIterator over paginated JSON data from a Github developer
+        API call
+
+        If a cursor is given, pagination starts from its URL when set and the
+        cursor is advanced to the next page's URL before each page is returned.
+        No more than max_pages pages are requested.
         """
         if params is None:
             params = {}
 
         url = self.BASE_URL + endpoint
 
-        next_link = True
-        while next_link:
-            try:
-                response = self.call(method, url, params)
-            except StopIteration:
-                # Handle PEP 479
-                return
+        if cursor is not None and cursor.url:
+            # The saved next link already carries the query parameters
+            url = cursor.url
+            params = {}
+
+        return PageIterator(self, method, url, params, cursor, prefetch=self.prefetch,
+                            max_pages=max_pages)
 
-            yield (response.json(), response.status_code)
-            next_link = response.links.get("next", {})
-            url = next_link.get("url")
+    def search_commits(self, query, sort=None, order=None):
+        """
+        Return commits matching a search query across every public repository
+
+        Only the first 1000 results are available.
+
+        https://developer.github.com/v3/search/#search-commits
+        """
+        sort_values = ["author-date", "committer-date"]
+        if sort not in sort_values and sort is not None:
+            raise ValueError("sort must be one of {}".format(sort_values))
+
+        order_values = ["asc", "desc"]
+        if order not in order_values and order is not None:
+            raise ValueError("order must be one of {}".format(order_values))
+
+        method = "GET"
+        endpoint = "/search/commits"
+        params = {
+            "q": query,
+            "per_page": 100,
+        }
+
+        if sort:
+            params["sort"] = sort
+        if order:
+            params["order"] = order
+
+        result = self.paginated_json_call(method, endpoint, params)
+
+        return result
 
     def get_user(self, username):
         """
@@ -232,7 +818,8 @@ class Api(object):
         """
         return self.get_public_organization(organization)
 
-    def get_organizations_public_repositories(self, organization, type_=None):
+    def get_organizations_public_repositories(self, organization, type_=None, sort=None,
+                                              direction=None):
         """
         Return public repositories associated with a given organization
 
@@ -242,12 +829,24 @@ class Api(object):
         if type_ not in type_values and type_ is not None:
             raise ValueError("type must be one of {}".format(type_values))
 
+        sort_values = ["created", "updated", "pushed", "full_name"]
+        if sort not in sort_values and sort is not None:
+            raise ValueError("sort must be one of {}".format(sort_values))
+
+        direction_values = ["asc", "desc"]
+        if direction not in direction_values and direction is not None:
+            raise ValueError("direction must be one of {}".format(direction_values))
+
         method = "GET"
         endpoint = "/orgs/{}/repos".format(organization)
         params = {}
 
         if type_:
             params["type"] = type_
+        if sort:
+            params["sort"] = sort
+        if direction:
+            params["direction"] = direction
 
         result = self.paginated_json_call(method, endpoint, params)
 
@@ -267,6 +866,38 @@ class Api(object):
 
         return result
 
+    def get_organizations_public_events(self, organization):
+        """
+        Return recent public events associated with a given organization
+
+        https://developer.github.com/v3/activity/events/#list-public-events-for-an-organization
+        """
+        method = "GET"
+        endpoint = "/orgs/{}/events".format(organization)
+        # Only the last 300 events are available, fetch them in as few pages
+        # as possible
+        params = {"per_page": 100}
+
+        result = self.paginated_json_call(method, endpoint, params)
+
+        return result
+
+    def get_users_public_events(self, username):
+        """
+        Return recent public events performed by a user
+
+        https://developer.github.com/v3/activity/events/#list-public-events-performed-by-a-user
+        """
+        method = "GET"
+        endpoint = "/users/{}/events/public".format(username)
+        # Only the last 300 events are available, fetch them in as few pages
+        # as possible
+        params = {"per_page": 100}
+
+        result = self.paginated_json_call(method, endpoint, params)
+
+        return result
+
     def get_public_repository(self, owner, repository):
         """
         Return public information associated with a repository
@@ -302,10 +933,36 @@ class Api(object):
 
         return result
 
+    def get_repository_contributor_statistics(self, owner, repository):
+        """
+        Return the commits, additions and deletions of each contributor to a
+        given repository
+
+        Github answers 202 Accepted with no statistics while it computes them,
+        the request has to be made again later. Repositories without commits
+        have no statistics.
+
+        https://developer.github.com/v3/repos/statistics/#get-contributors-list-with-additions-deletions-and-commit-counts
+        """
+        method = "GET"
+        url = self.BASE_URL + "/repos/{}/{}/stats/contributors".format(owner, repository)
+
+        response = self.call(method, url)
+
+        if response.status_code in [requests.codes.ACCEPTED, requests.codes.NO_CONTENT]:
+            return ([], response.status_code)
+
+        with profiling.timer(self.profiler, "decode"):
+            result = codec.loads(response.content)
+
+        return (result, response.status_code)
+
     def get_repository_commits(self, owner, repository, sha=None, path=None,
-                               author=None, since=None, until=None):
+                               author=None, since=None, until=None, cursor=None,
+                               max_pages=None):
         """
-        Return commit information associated with a given repository
+        Return commit information associated with a given repository, up to
+        max_pages pages of it
 
         https://developer.github.com/v3/repos/commits/#list-commits-on-a-repository
         """
@@ -324,6 +981,6 @@ class Api(object):
         if until:
             params["until"] = until
 
-        result = self.paginated_json_call(method, endpoint, params)
+        result = self.paginated_json_call(method, endpoint, params, cursor, max_pages)
 
         return result
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+
+def dump_response(response):
+    """
+    Convert a response into a plain record suitable for caching
+    """
+    return {
+        "url": response.url,
+        "status_code": response.status_code,
+        "headers": dict(response.headers),
+        "content": response.content,
+    }
+
+
+def load_response(record):
+    """
+    Rebuild a response from a cached record
+    """
+    response = requests.Response()
+    response.url = record["url"]
+    response.status_code = record["status_code"]
+    response.headers = requests.structures.CaseInsensitiveDict(record["headers"])
+    response._content = record["content"]
+
+    return response
+
+
+class MemoryCache(object):
+    """
+    A thread-safe, in-process LRU cache whose entries expire after a TTL
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= self.clock():
+                return None
+
+            # Re-insert to mark the entry as most recently used
+            self.entries[key] = entry
+
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (self.clock() + self.ttl, value)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class SqliteStore(object):
+    """
+    A SQLite database that can be shared by multiple threads and processes
+
+    Each thread of each process opens its own connection to the database.
+    """
+
+    SCHEMA = []
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.local = threading.local()
+
+        for statement in self.SCHEMA:
+            self.connection().execute(statement)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.local = threading.local()
+
+    def connection(self):
+        # Connections can't be shared between threads, or inherited across a
+        # fork, so open one per thread per process
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+
+        return self.local.connection
+
+
+class SqliteCache(SqliteStore):
+    """
+    An LRU cache of responses stored on disk that can be shared by multiple
+    processes and consecutive runs
+
+    Entries expire after a TTL and the least recently used entries are evicted
+    once the total size of stored bodies exceeds max_size bytes.
+    """
+
+    FILENAME = "responses.sqlite"
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            status_code INTEGER,
+            headers TEXT,
+            content BLOB,
+            size INTEGER,
+            fetched_at REAL,
+            expires_at REAL,
+            accessed_at REAL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS responses_accessed_at
+        ON responses (accessed_at)
+        """,
+    ]
+
+    # Check the total size after this many writes rather than on every write
+    EVICTION_INTERVAL = 64
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, clock=time.time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        super(SqliteCache, self).__init__(os.path.join(directory, self.FILENAME))
+
+    def __len__(self):
+        return self.connection().execute(
+            "SELECT COUNT(*) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key):
+        connection = self.connection()
+        now = self.clock()
+
+        row = connection.execute(
+            "SELECT url, status_code, headers, content, expires_at FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        url, status_code, headers, content, expires_at = row
+        if expires_at <= now:
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+
+        connection.execute(
+            "UPDATE responses SET accessed_at = ? WHERE key = ?",
+            (now, key)
+        )
+
+        return {
+            "url": url,
+            "status_code": status_code,
+            "headers": json.loads(headers),
+            "content": bytes(content),
+        }
+
+    def set(self, key, value):
+        connection = self.connection()
+        now = self.clock()
+
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                value["url"],
+                value["status_code"],
+                json.dumps(value["headers"]),
+                sqlite3.Binary(value["content"]),
+                len(value["content"]),
+                now,
+                now + self.ttl,
+                now,
+            )
+        )
+
+        self.local.writes = getattr(self.local, "writes", 0) + 1
+        if self.local.writes % self.EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove expired entries, then least recently used entries until the
+        stored bodies fit in max_size
+        """
+        connection = self.connection()
+
+        connection.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),))
+
+        size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        rows = connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+
+        evicted = []
+        for key, entry_size in rows:
+            if size <= self.max_size:
+                break
+            evicted.append((key,))
+            size -= entry_size
+
+        connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
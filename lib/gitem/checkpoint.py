@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import collections
+import json
+
+from . import cache
+
+
+class Checkpoint(cache.SqliteStore):
+    """
+    Persist the results of completed units of work, and the pagination
+    cursors of partially completed ones, so an interrupted scan can resume
+
+    Workers in other processes record their progress in the same file.
+    Unless resuming, any state left by a previous scan is discarded.
+    """
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS units (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cursors (
+            key TEXT PRIMARY KEY,
+            url TEXT,
+            state TEXT
+        )
+        """,
+    ]
+
+    def __init__(self, path, resume=False):
+        super(Checkpoint, self).__init__(path)
+
+        if not resume:
+            self.connection().execute("DELETE FROM units")
+            self.connection().execute("DELETE FROM cursors")
+
+    @staticmethod
+    def loads(value):
+        return json.loads(value, object_pairs_hook=collections.OrderedDict)
+
+    def get(self, key):
+        """
+        Return the result of a completed unit, or None
+        """
+        row = self.connection().execute(
+            "SELECT value FROM units WHERE key = ?",
+            (key,)
+        ).fetchone()
+
+        return None if row is None else self.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Record the result of a completed unit, dropping its cursor
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.execute(
+                "INSERT OR REPLACE INTO units VALUES (?, ?)",
+                (key, json.dumps(value))
+            )
+            connection.execute("DELETE FROM cursors WHERE key = ?", (key,))
+
+    def get_cursor(self, key):
+        """
+        Return the next page URL and partial state of an incomplete unit, or
+        (None, None)
+        """
+        row = self.connection().execute(
+            "SELECT url, state FROM cursors WHERE key = ?",
+            (key,)
+        ).fetchone()
+
+        return (None, None) if row is None else (row[0], self.loads(row[1]))
+
+    def set_cursor(self, key, url, state):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)",
+            (key, url, json.dumps(state))
+        )
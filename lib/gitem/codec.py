@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import collections
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+def stdlib_loads(data):
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, separators=(",", ":"))
+
+
+def orjson_dumps(data):
+    return orjson.dumps(data).decode("utf-8")
+
+
+Backend = collections.namedtuple("Backend", ["name", "loads", "dumps"])
+
+# Fastest first, native libraries decode straight from the response bytes
+BACKENDS = collections.OrderedDict()
+if orjson is not None:
+    BACKENDS["orjson"] = Backend("orjson", orjson.loads, orjson_dumps)
+if simdjson is not None:
+    BACKENDS["simdjson"] = Backend("simdjson", simdjson.loads, stdlib_dumps)
+BACKENDS["json"] = Backend("json", stdlib_loads, stdlib_dumps)
+
+backend = next(iter(BACKENDS.values()))
+
+
+def use(name):
+    """
+    Select the JSON backend used by loads and dumps
+    """
+    global backend
+
+    if name not in BACKENDS:
+        raise ValueError("JSON backend must be one of {}".format(list(BACKENDS)))
+
+    backend = BACKENDS[name]
+
+
+def loads(data):
+    """
+    Decode JSON from bytes or text
+    """
+    return backend.loads(data)
+
+
+def dumps(data):
+    """
+    Encode data as compact JSON text
+    """
+    return backend.dumps(data)
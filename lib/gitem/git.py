@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import os
+import subprocess
+
+FIELD_SEPARATOR = b"\x00"
+RECORD_SEPARATOR = b"\x1e"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def clone(clone_url, directory):
+    """
+    Make a bare, blobless clone of a repository
+
+    Only commits and trees are fetched, file contents are never needed to
+    read commit metadata.
+    """
+    with open(os.devnull, "wb") as devnull:
+        subprocess.check_call(
+            [
+                "git",
+                "clone",
+                "--bare",
+                "--quiet",
+                "--filter=blob:none",
+                clone_url,
+                directory,
+            ],
+            stdout=devnull,
+            stderr=devnull,
+        )
+
+
+def has_commits(directory):
+    with open(os.devnull, "wb") as devnull:
+        return subprocess.call(
+            ["git", "--git-dir", directory, "rev-parse", "--verify", "--quiet", "HEAD"],
+            stdout=devnull,
+            stderr=devnull,
+        ) == 0
+
+
+def log(directory, placeholders, author=None, since=None, until=None, max_count=None,
+        author_emails=None):
+    """
+    Stream the requested pretty format placeholders for each commit reachable
+    from HEAD
+
+    author is matched anywhere in the author name and email, author_emails
+    only match an author email exactly, ignoring case.
+
+    https://git-scm.com/docs/git-log#_pretty_formats
+    """
+    if not has_commits(directory):
+        return
+
+    command = [
+        "git",
+        "--git-dir",
+        directory,
+        "log",
+        "--format={}%x1e".format("%x00".join(placeholders)),
+    ]
+
+    if author or author_emails:
+        command.append("--fixed-strings")
+    if author:
+        command.append("--author={}".format(author))
+    if author_emails:
+        # Authors are matched against "name <email>"
+        command.append("--regexp-ignore-case")
+        command += ["--author=<{}>".format(email) for email in author_emails]
+    if since:
+        command.append("--since={}".format(since))
+    if until:
+        command.append("--until={}".format(until))
+    if max_count is not None:
+        command.append("--max-count={}".format(max_count))
+
+    with open(os.devnull, "wb") as devnull:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=devnull)
+
+    buffered = b""
+    try:
+        for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):
+            records = (buffered + chunk).split(RECORD_SEPARATOR)
+            buffered = records.pop()
+
+            for record in records:
+                yield tuple(
+                    field.decode("utf-8", "replace")
+                    for field in record.lstrip(b"\n").split(FIELD_SEPARATOR)
+                )
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
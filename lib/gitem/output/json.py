@@ -7,9 +7,8 @@ from __future__ import (
     unicode_literals,
 )
 
-import json
-
 from . import base
+from .. import codec
 
 
 class Json(base.Base):
@@ -17,6 +16,6 @@ class Json(base.Base):
     name = "json"
 
     def output(self, data):
-        output = json.dumps(data, separators=(",", ":"))
+        output = codec.dumps(data)
 
         print(output, file=self.file)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import heapq
+import itertools
+import threading
+
+
+class MemoryBudget(object):
+    """
+    A ceiling on the bytes held in queues between pipeline stages, shared by
+    every queue that reserves against it
+
+    A producer blocks in acquire until consumers release enough. An item
+    larger than the whole ceiling is still let through once nothing else is
+    held so it can't block forever. A limit of None never blocks.
+
+    A producer passing an owner that holds nothing acquires without
+    blocking, so items held up in one stage can't starve another stage whose
+    progress they're waiting on. The ceiling can be passed by an item per
+    owner.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.held = 0
+        self.owners = {}
+        self.condition = threading.Condition()
+
+    def __getstate__(self):
+        # Each process keeps its own budget
+        state = self.__dict__.copy()
+        del state["condition"]
+        state["held"] = 0
+        state["owners"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.condition = threading.Condition()
+
+    def acquire(self, size, owner=None):
+        with self.condition:
+            while (
+                self.limit is not None
+                and self.held > 0
+                and self.held + size > self.limit
+                and (owner is None or self.owners.get(owner))
+            ):
+                self.condition.wait()
+
+            self.held += size
+            if owner is not None:
+                self.owners[owner] = self.owners.get(owner, 0) + size
+
+    def release(self, size, owner=None):
+        with self.condition:
+            self.held -= size
+            if owner is not None:
+                self.owners[owner] -= size
+                if not self.owners[owner]:
+                    del self.owners[owner]
+            self.condition.notify_all()
+
+
+def first(records, count=None):
+    """
+    Return the first count records, or all of them when count is None
+
+    Stops consuming records once count have been read.
+    """
+    try:
+        return list(itertools.islice(records, count))
+    finally:
+        # Stop fetching pages nobody will read, lists can't be closed
+        close = getattr(records, "close", None)
+        if close is not None:
+            close()
+
+
+def largest(records, key, count=None):
+    """
+    Return the count largest records by key, or all of them sorted when count
+    is None
+
+    Only count records are held while the rest stream past. Ties keep the
+    order they arrived in, the same as sorted.
+    """
+    if count is None:
+        return sorted(records, key=key, reverse=True)
+
+    return heapq.nlargest(count, records, key=key)
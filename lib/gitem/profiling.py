@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import collections
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import timeit
+
+# Time spent in these categories is broken out of each stage's total, the
+# rest of a stage is spent transforming results
+CATEGORIES = ["fetch", "decode"]
+
+SAMPLE_INTERVAL = 0.005
+
+
+@contextlib.contextmanager
+def stage(profiler, name):
+    """
+    Time a stage of a command, does nothing if profiler is None
+    """
+    if profiler is None:
+        yield
+    else:
+        with profiler.stage(name):
+            yield
+
+
+@contextlib.contextmanager
+def timer(profiler, category):
+    """
+    Time part of the current stage, does nothing if profiler is None
+    """
+    if profiler is None:
+        yield
+    else:
+        with profiler.timer(category):
+            yield
+
+
+def frame_label(frame):
+    return "{}:{}".format(
+        os.path.basename(frame.f_code.co_filename),
+        frame.f_code.co_name
+    )
+
+
+class Sampler(object):
+    """
+    Periodically sample the stacks of every thread and count them in the
+    collapsed format used by flamegraph tools
+
+    https://github.com/brendangregg/FlameGraph#2-fold-stacks
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def run(self):
+        ident = threading.current_thread().ident
+
+        while not self.stopped.wait(self.interval):
+            for thread_ident, frame in sys._current_frames().items():
+                if thread_ident == ident:
+                    continue
+
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, file_):
+        for stack, count in sorted(self.stacks.items()):
+            print("{} {}".format(stack, count), file=file_)
+
+
+class TimedOutput(object):
+    """
+    Wrap an outputter to count the time spent writing results as a stage
+    """
+
+    def __init__(self, outputter, profiler):
+        self.outputter = outputter
+        self.profiler = profiler
+
+    def output(self, data):
+        with self.profiler.stage("output"):
+            self.outputter.output(data)
+
+
+class Profiler(object):
+    """
+    Break a command's wall time down by stage, and optionally sample stacks
+    or run cProfile while it runs
+
+    Only time spent in this process is broken down, work done by other
+    processes counts towards the stage that waits on it.
+    """
+
+    def __init__(self, stacks_path=None, cprofile_path=None, clock=timeit.default_timer):
+        self.stacks_path = stacks_path
+        self.cprofile_path = cprofile_path
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stages = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self.sampler = None
+        self.cprofile = None
+
+    def add(self, stage_name, category, elapsed):
+        with self.lock:
+            times = self.stages.setdefault(stage_name, collections.Counter())
+            times[category] += elapsed
+
+    def count(self, name, value):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        stack = getattr(self.local, "stages", None)
+        if stack is None:
+            stack = self.local.stages = []
+
+        stack.append(name)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(name, "total", self.clock() - start)
+            stack.pop()
+
+    @contextlib.contextmanager
+    def timer(self, category):
+        stack = getattr(self.local, "stages", None)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(stack[-1] if stack else "other", category, self.clock() - start)
+
+    def start(self):
+        if self.stacks_path:
+            self.sampler = Sampler()
+            self.sampler.start()
+        if self.cprofile_path:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+        if self.sampler is not None:
+            self.sampler.stop()
+            with open(self.stacks_path, "w") as fd:
+                self.sampler.write(fd)
+
+    def report(self, file_=sys.stderr):
+        """
+        Print a table of the time spent in each stage
+        """
+        row = "{:<32} {:>10} {:>10} {:>10} {:>10}"
+
+        print(row.format("Stage", "Total", "Fetch", "Decode", "Other"), file=file_)
+        for name, times in self.stages.items():
+            total = times["total"] or sum(times.values())
+            other = max(total - sum(times[category] for category in CATEGORIES), 0)
+            print(row.format(
+                name,
+                *[
+                    "{:.3f}s".format(value)
+                    for value in [total] + [times[category] for category in CATEGORIES] + [other]
+                ]
+            ), file=file_)
+
+        for name, value in self.counters.items():
+            print("{}: {}".format(name, value), file=file_)
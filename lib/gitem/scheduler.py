@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import functools
+import heapq
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+try:
+    # Python 3
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+import requests
+
+# Repositories listed but not yet handed to a worker before listing pauses
+QUEUE_SIZE = 200
+
+# Marks the end of the repositories on a queue
+DONE = None
+
+# Seconds before polling an accepted request again, doubled after each poll
+POLL_INTERVAL = 1
+POLL_MAX_INTERVAL = 32
+
+# Polls of a request before giving up on it
+POLL_ATTEMPTS = 10
+
+# Requests made at the same time while polling
+POLL_WORKERS = 8
+
+
+class Failure(object):
+    """
+    An exception raised by work handed to a pool, carried back so it can be
+    raised again by whoever collects the result
+
+    Pools only catch Exception. The Api's exceptions derive from
+    BaseException, escaping a pool they kill the worker and leave its result
+    waiting forever.
+    """
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def capture(func, *args):
+    """
+    Return the result of func, or a Failure holding what it raised
+    """
+    try:
+        return func(*args)
+    except BaseException as e:
+        return Failure(e)
+
+
+def unwrap(result):
+    """
+    Return a result returned by capture, raising the exception it holds
+    """
+    if isinstance(result, Failure):
+        raise result.exception
+
+    return result
+
+
+def repository_cost(repository):
+    """
+    Estimate how expensive scanning a repository's history will be
+
+    Size is the best proxy for the length of the history, forks and the last
+    push break ties between repositories of similar size.
+    """
+    return (
+        repository.get('Size') or 0,
+        repository.get('Forks') or 0,
+        repository.get('Last Pushed') or '',
+    )
+
+
+def prioritize(repositories, skip_forks=False, skip_archived=False):
+    """
+    Return repositories ordered most expensive first
+
+    Handing out the most expensive work first, one repository at a time,
+    keeps a single large repository from being left until the end while the
+    other workers sit idle.
+    """
+    return sorted(
+        (
+            repository
+            for repository in repositories
+            if not (skip_forks and repository.get('Fork'))
+            and not (skip_archived and repository.get('Archived'))
+        ),
+        key=repository_cost,
+        reverse=True
+    )
+
+
+def make_queue(maxsize=QUEUE_SIZE):
+    return queue.Queue(maxsize=maxsize)
+
+
+def produce(pages, repository_queue, skip_forks=False, skip_archived=False, limit=None,
+            keep=None):
+    """
+    Put repositories on repository_queue as soon as their page is listed and
+    return the first limit listed repositories, or all of them
+
+    keep, when given, is called with each repository and those it returns
+    False for are listed but not queued. Without a queue repositories are
+    only listed.
+
+    Only the repositories within a page can be ordered most expensive first,
+    the rest haven't been listed yet. The queue is bounded so listing pauses
+    while the workers fall behind.
+    """
+    repositories = []
+
+    try:
+        for page in pages:
+            if limit is None:
+                repositories.extend(page)
+            else:
+                repositories.extend(page[:limit - len(repositories)])
+            if repository_queue is None:
+                continue
+
+            for repository in prioritize(page, skip_forks, skip_archived):
+                if keep is None or keep(repository):
+                    repository_queue.put(repository)
+    finally:
+        # Always let consumers finish, even if listing failed
+        if repository_queue is not None:
+            repository_queue.put(DONE)
+
+    return repositories
+
+
+def consume(repository_queue):
+    """
+    Yield repositories from repository_queue until the producer is done
+    """
+    return iter(repository_queue.get, DONE)
+
+
+def imap_bounded(pool, func, items, limit):
+    """
+    Start handing items to func on pool and return an iterator over the
+    results in the order they finish, raising what func raised
+
+    At most limit items are handed out before their results are taken. On
+    its own imap_unordered drains items into the pool's unbounded task queue
+    straight away, so nothing upstream would ever wait on the workers.
+    """
+    slots = threading.Semaphore(limit)
+    stopped = threading.Event()
+
+    def acquired():
+        for item in items:
+            if not stopped.is_set():
+                slots.acquire()
+            if stopped.is_set():
+                # Nobody takes results anymore, drain the items so whatever
+                # produces them can finish
+                continue
+
+            yield item
+
+    results = pool.imap_unordered(functools.partial(capture, func), acquired())
+
+    def released():
+        try:
+            for result in results:
+                slots.release()
+                yield unwrap(result)
+        finally:
+            stopped.set()
+            slots.release()
+
+    return released()
+
+
+def poll(calls, interval=POLL_INTERVAL, max_interval=POLL_MAX_INTERVAL,
+         attempts=POLL_ATTEMPTS, workers=POLL_WORKERS, clock=time.time, sleep=time.sleep):
+    """
+    Yield (key, result) for (key, call) pairs as each result becomes ready
+
+    A call returns (result, status_code) like the Api methods do, 202 Accepted
+    meaning the result is still being computed. Every call is made up front
+    and the accepted ones are polled again on their own backoff, so a slow
+    result never holds up the others. A call still accepted after attempts
+    polls yields None, one that raises stops the polling and is raised.
+    """
+    # (due, order, key, call, attempt, delay)
+    pending = [
+        (0, order, key, call, 1, interval)
+        for order, (key, call) in enumerate(calls)
+    ]
+    heapq.heapify(pending)
+
+    def make(entry):
+        return entry, capture(entry[3])
+
+    pool = ThreadPool(processes=workers)
+
+    try:
+        while pending:
+            now = clock()
+            if pending[0][0] > now:
+                sleep(pending[0][0] - now)
+                now = clock()
+
+            due = []
+            while pending and pending[0][0] <= now:
+                due.append(heapq.heappop(pending))
+
+            for entry, response in pool.imap_unordered(make, due):
+                _, order, key, call, attempt, delay = entry
+                result, status_code = unwrap(response)
+
+                if status_code != requests.codes.ACCEPTED:
+                    yield (key, result)
+                elif attempt >= attempts:
+                    yield (key, None)
+                else:
+                    heapq.heappush(pending, (
+                        clock() + delay,
+                        order,
+                        key,
+                        call,
+                        attempt + 1,
+                        min(delay * 2, max_interval),
+                    ))
+    finally:
+        pool.terminate()
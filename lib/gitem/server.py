@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import io
+import json
+import multiprocessing
+
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlparse
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qs, urlparse
+
+import requests
+
+from . import api
+from . import coalesce
+from . import output
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Each query starts its own workers, a single one asking for more than this
+# would crowd out every other query
+MAX_PROCESSES = multiprocessing.cpu_count()
+
+# Positional path arguments accepted by each command
+ROUTES = {
+    "organization": ["name"],
+    "repository": ["owner", "name"],
+    "user": ["name"],
+}
+
+
+class NotFound(Exception):
+    pass
+
+
+def parse_path(path):
+    """
+    Return the command name and keyword arguments requested by a URL path
+    """
+    parsed = urlparse(path)
+    parts = [unquote(part) for part in parsed.path.split("/") if part]
+
+    if not parts or parts[0] not in ROUTES or len(parts) - 1 != len(ROUTES[parts[0]]):
+        raise NotFound(parsed.path)
+
+    command = parts[0]
+    kwargs = dict(zip(ROUTES[command], parts[1:]))
+
+    query = parse_qs(parsed.query)
+    kwargs["verbose"] = query.get("verbose", ["0"])[-1].lower() in ("1", "true", "yes")
+    processes = int(query.get("processes", ["0"])[-1])
+    kwargs["processes"] = min(max(processes, 0), MAX_PROCESSES) or None
+    # Forking from a request thread could copy locks other requests hold
+    kwargs["threads"] = True
+
+    return command, kwargs
+
+
+class Application(object):
+    """
+    Run gitem commands against a single long-lived Api
+
+    Sharing the Api shares its connection pool, response cache and rate limit
+    budget between queries. Identical queries that arrive while one is already
+    running are coalesced into a single run.
+    """
+
+    def __init__(self, ghapi, dispatch):
+        self.ghapi = ghapi
+        self.dispatch = dispatch
+        self.flights = coalesce.SingleFlight()
+
+    def run(self, command, kwargs):
+        stream = io.StringIO()
+        outputter = output.Json(file_=stream)
+
+        self.dispatch[command](self.ghapi, outputter, **kwargs)
+
+        return stream.getvalue()
+
+    def rate_limit(self):
+        return json.dumps({
+            "Remaining": self.ghapi.rate_limit_remaining,
+            "Reset": self.ghapi.rate_limit_reset,
+        }) + "\n"
+
+    def handle(self, path):
+        """
+        Return the status code and body for a request path
+        """
+        if urlparse(path).path.rstrip("/") == "/rate_limit":
+            return requests.codes.OK, self.rate_limit()
+
+        try:
+            command, kwargs = parse_path(path)
+        except NotFound:
+            return requests.codes.NOT_FOUND, error("Unknown resource")
+        except ValueError:
+            return requests.codes.BAD_REQUEST, error("Invalid query parameter")
+
+        key = (command, tuple(sorted(kwargs.items())))
+
+        try:
+            body = self.flights.do(key, self.run, command, kwargs)
+        except api.AuthenticationRequiredException:
+            return requests.codes.UNAUTHORIZED, error("Please include an OAuth2 token.")
+        except api.ApiCallException as e:
+            if e.rate_limiting:
+                return requests.codes.TOO_MANY_REQUESTS, error(
+                    "Your API requests are being rate-limited. See {}".format(e.rate_limiting_url)
+                )
+            elif e.not_found:
+                return requests.codes.NOT_FOUND, error(
+                    "The requested resource was not found or private."
+                )
+            return requests.codes.BAD_GATEWAY, error(str(e))
+        except Exception:
+            return requests.codes.INTERNAL_SERVER_ERROR, error("The query failed.")
+
+        return requests.codes.OK, body
+
+
+def error(message):
+    return json.dumps({"Error": message}) + "\n"
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        status_code, body = self.server.application.handle(self.path)
+        content = body.encode("utf-8")
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args, **kwargs):
+        # Keep stderr quiet, clients receive errors in the response body
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, application, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.application = application
+
+        HTTPServer.__init__(self, (host, port), RequestHandler)
+
+
+def serve(ghapi, dispatch, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = Server(Application(ghapi, dispatch), host, port)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
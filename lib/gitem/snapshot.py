@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import collections
+import json
+
+from . import cache
+
+
+class Snapshot(cache.SqliteStore):
+    """
+    Persist the repositories of organizations between scans, so a later scan
+    only has to list the repositories pushed to since
+
+    Unlike a Checkpoint, a snapshot is kept from one scan to the next.
+    """
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS repositories (
+            organization TEXT,
+            name TEXT,
+            pushed_at TEXT,
+            value TEXT,
+            PRIMARY KEY (organization, name)
+        )
+        """,
+    ]
+
+    def get(self, organization):
+        """
+        Return the recorded repositories of an organization by name, most
+        recently pushed first
+        """
+        rows = self.connection().execute(
+            "SELECT name, value FROM repositories WHERE organization = ? ORDER BY pushed_at DESC, name",
+            (organization,)
+        ).fetchall()
+
+        return collections.OrderedDict([
+            (name, json.loads(value, object_pairs_hook=collections.OrderedDict))
+            for name, value in rows
+        ])
+
+    def update(self, organization, repositories):
+        """
+        Record repositories of an organization, replacing earlier records of
+        the same repositories
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO repositories VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        organization,
+                        repository['Repository Name'],
+                        repository['Last Pushed'],
+                        json.dumps(repository),
+                    )
+                    for repository in repositories
+                ]
+            )
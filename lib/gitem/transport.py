@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals,
+)
+
+import threading
+import warnings
+
+import requests
+
+try:
+    import httpx
+    import h2  # noqa: F401, httpx needs it for HTTP/2
+except ImportError:
+    httpx = None
+
+try:
+    import brotli  # noqa: F401, urllib3 and httpx decode br when it's installed
+except ImportError:
+    try:
+        import brotlicffi as brotli  # noqa: F401
+    except ImportError:
+        brotli = None
+
+# Listings of commits and repositories are repetitive JSON and compress well
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+DEFAULT_TIMEOUT = 60
+
+# Concurrent requests are multiplexed as streams over these connections
+DEFAULT_MAX_CONNECTIONS = 4
+
+# HTTP/1.1 connections kept open per host, enough for the stage threads,
+# member lookups, threaded scans and served queries running at once
+DEFAULT_POOL_SIZE = 32
+
+
+class Http2Response(object):
+    """
+    Adapt an httpx response to the parts of requests.Response used by Api
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+    @property
+    def url(self):
+        return str(self.response.url)
+
+    @property
+    def status_code(self):
+        return self.response.status_code
+
+    @property
+    def ok(self):
+        return self.response.status_code < 400
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    @property
+    def content(self):
+        return self.response.content
+
+    @property
+    def links(self):
+        return self.response.links
+
+    @property
+    def num_bytes_downloaded(self):
+        return self.response.num_bytes_downloaded
+
+    def json(self):
+        return self.response.json()
+
+
+def transferred_bytes(response):
+    """
+    Return the size of a response body as received, before decompression,
+    or None when the transport doesn't report it
+    """
+    sizes = [getattr(response, "num_bytes_downloaded", None)]
+
+    # urllib3 counts the raw bytes read while it decompresses each chunk
+    tell = getattr(getattr(response, "raw", None), "tell", None)
+    if tell is not None:
+        sizes.append(tell())
+
+    for size in sizes:
+        if isinstance(size, int) and not isinstance(size, bool):
+            return size
+
+    return None
+
+
+class Http2Requester(object):
+    """
+    Send requests through a shared HTTP/2 client, which multiplexes
+    concurrent requests over a few connections instead of opening one
+    connection per in-flight request
+
+    Each process creates its own client.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 **client_kwargs):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.client_kwargs = client_kwargs
+        self.lock = threading.Lock()
+        self.http_client = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        state["http_client"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def client(self):
+        with self.lock:
+            if self.http_client is None:
+                self.http_client = httpx.Client(
+                    http2=True,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_connections),
+                    **self.client_kwargs
+                )
+
+            return self.http_client
+
+    def __call__(self, method, url, params=None, headers=None):
+        # Empty params would replace the query of a next link instead of
+        # adding to it
+        response = self.client().request(method, url, params=params or None, headers=headers)
+
+        return Http2Response(response)
+
+    def close(self):
+        with self.lock:
+            if self.http_client is not None:
+                self.http_client.close()
+                self.http_client = None
+
+
+def get_requester(http2=False, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Return a requester for Api that keeps connections open between requests
+
+    HTTP/2 requires httpx and h2, HTTP/1.1 is used when they aren't installed.
+    Over HTTP/1.1 up to pool_size connections per host are kept open.
+    """
+    if http2:
+        if httpx is not None:
+            return Http2Requester()
+
+        warnings.warn("HTTP/2 requires the http2 extra, falling back to HTTP/1.1")
+
+    # The default pool of 10 would throw away connections of concurrent
+    # requests past the tenth instead of keeping them warm
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session.request
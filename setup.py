@@ -53,6 +53,12 @@ setup(
         'Programming Language :: Python :: 3.8',
     ],
     install_requires=install_requires,
+    extras_require={
+        # Faster JSON decoding and encoding, used when installed
+        'fast': ['orjson'],
+        # Multiplexed HTTP/2 transport, enabled with --http2
+        'http2': ['httpx[http2]'],
+    },
     tests_require=tests_require,
     entry_points={
         'console_scripts': [
@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 
 import collections
+import functools
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 
 try:
@@ -15,6 +20,22 @@ import pytest
 
 from gitem import analytics
 from gitem import api
+from gitem import checkpoint
+from gitem import scheduler
+from gitem import snapshot
+
+import test_git
+
+
+def paged(pages):
+    """
+    Return a mock paginated call over (json, status_code) pages
+    """
+    pages = iter(pages)
+    result = mock.MagicMock(links={})
+    result.__iter__.return_value = pages
+    result.items.side_effect = lambda: (item for page, _ in pages for item in page)
+    return result
 
 
 class TestAnalytics(unittest.TestCase):
@@ -79,7 +100,7 @@ class TestAnalytics(unittest.TestCase):
 
         ghapi = mock.MagicMock()
         ghapi.get_organizations_public_repositories = mock.MagicMock(
-            return_value=return_value
+            return_value=paged(return_value)
         )
 
         result = analytics.get_organization_repositories(ghapi, "unused")
@@ -101,6 +122,52 @@ class TestAnalytics(unittest.TestCase):
 
         assert result == expected
 
+    def test_get_organization_repositories_delta(self):
+        def page(*repositories):
+            return ([
+                {
+                    'name': name,
+                    'description': '',
+                    'html_url': '',
+                    'clone_url': '',
+                    'watchers_count': 0,
+                    'stargazers_count': 0,
+                    'forks_count': 0,
+                    'created_at': '',
+                    'updated_at': '',
+                    'pushed_at': pushed,
+                }
+                for name, pushed in repositories
+            ], requests.codes.OK)
+
+        def paged_generator():
+            yield page(('name3', '2020-03-01T00:00:00Z'), ('name1', '2020-02-01T00:00:00Z'))
+            yield page(('name2', '2020-01-01T00:00:00Z'))
+            raise AssertionError('listed past an unchanged repository')
+
+        directory = tempfile.mkdtemp()
+        try:
+            state = snapshot.Snapshot(os.path.join(directory, 'snapshot.sqlite'))
+            state.update('organization', [
+                collections.OrderedDict([('Repository Name', 'name1'), ('Last Pushed', '2020-01-15T00:00:00Z')]),
+                collections.OrderedDict([('Repository Name', 'name2'), ('Last Pushed', '2020-01-01T00:00:00Z')]),
+            ])
+
+            ghapi = mock.MagicMock()
+            ghapi.get_organizations_public_repositories = mock.MagicMock(
+                return_value=paged(paged_generator())
+            )
+
+            repositories, changed = analytics.get_organization_repositories_delta(ghapi, 'organization', state)
+        finally:
+            shutil.rmtree(directory)
+
+        _, kwargs = ghapi.get_organizations_public_repositories.call_args
+        assert kwargs == {'sort': 'pushed', 'direction': 'desc'}
+        assert [repository['Repository Name'] for repository in changed] == ['name3', 'name1']
+        assert [repository['Repository Name'] for repository in repositories] == ['name3', 'name1', 'name2']
+        assert repositories[1]['Last Pushed'] == '2020-02-01T00:00:00Z'
+
     def test_get_organization_members(self):
         return_value = [
             (
@@ -123,7 +190,7 @@ class TestAnalytics(unittest.TestCase):
 
         ghapi = mock.MagicMock()
         ghapi.get_organizations_public_members = mock.MagicMock(
-            return_value=return_value
+            return_value=paged(return_value)
         )
 
         result = analytics.get_organization_members(ghapi, "unused")
@@ -206,7 +273,7 @@ class TestAnalytics(unittest.TestCase):
 
         ghapi = mock.MagicMock()
         ghapi.get_repository_contributors = mock.MagicMock(
-            return_value=return_value
+            return_value=paged(return_value)
         )
 
         result = analytics.get_repository_contributors(ghapi, "unused", "unused")
@@ -224,6 +291,68 @@ class TestAnalytics(unittest.TestCase):
 
         assert result == expected
 
+    def test_get_members_detail(self):
+        members = [
+            collections.OrderedDict([
+                ('Username', username),
+                ('Site Administrator', False),
+                ('Github URL', 'hu'),
+            ])
+            for username in ['username1', 'username2']
+        ]
+
+        def get_user(username):
+            return ({
+                'login': username,
+                'html_url': 'hu',
+                'name': 'name-' + username,
+                'company': 'co',
+                'blog': 'blog',
+                'location': 'loc',
+                'email': 'email-' + username,
+                'created_at': 'ca',
+                'updated_at': 'ua',
+            }, requests.codes.OK)
+
+        ghapi = mock.MagicMock()
+        ghapi.get_user = mock.MagicMock(side_effect=get_user)
+
+        result = analytics.get_members_detail(ghapi, members, workers=2)
+
+        assert [member['Username'] for member in result] == ['username1', 'username2']
+        assert [member['Email Address'] for member in result] == ['email-username1', 'email-username2']
+        assert list(result[0].keys())[:4] == ['Username', 'Site Administrator', 'Github URL', 'Name']
+
+    def test_get_members_detail_errors(self):
+        members = [
+            collections.OrderedDict([
+                ('Username', username),
+                ('Site Administrator', False),
+                ('Github URL', 'hu'),
+            ])
+            for username in ['username1', 'deleted']
+        ]
+
+        def get_user(username):
+            if username == 'deleted':
+                raise api.ApiCallException(requests.codes.NOT_FOUND, {})
+
+            raise api.ApiCallException(requests.codes.FORBIDDEN, {
+                'documentation_url': api.ApiCallException.rate_limiting_url,
+            })
+
+        ghapi = mock.MagicMock()
+        ghapi.get_user = mock.MagicMock(side_effect=get_user)
+
+        with pytest.raises(api.ApiCallException) as e:
+            analytics.get_members_detail(ghapi, members, workers=2)
+
+        assert e.value.rate_limiting
+
+        result = analytics.get_members_detail(ghapi, members[1:], workers=2)
+
+        assert result == []
+
     def test_get_user_information(self):
         return_value = (
             {
@@ -279,7 +408,7 @@ class TestAnalytics(unittest.TestCase):
 
         ghapi = mock.MagicMock()
         ghapi.get_users_public_organizations = mock.MagicMock(
-            return_value=return_value
+            return_value=paged(return_value)
         )
 
         result = analytics.get_user_organizations(ghapi, "unused")
@@ -303,6 +432,12 @@ class TestAnalytics(unittest.TestCase):
                     'description': 'desc1',
                     'html_url': 'hu1',
                     'clone_url': 'cu1',
+                    'size': 's1',
+                    'fork': 'f1',
+                    'archived': 'a1',
+                    'forks_count': 'fc1',
+                    'created_at': 'ca1',
+                    'pushed_at': 'pa1',
                 }],
                 requests.codes.OK,
             )
@@ -321,6 +456,12 @@ class TestAnalytics(unittest.TestCase):
                 ('Description', 'desc1'),
                 ('Github URL', 'hu1'),
                 ('Clone URL', 'cu1'),
+                ('Size', 's1'),
+                ('Fork', 'f1'),
+                ('Archived', 'a1'),
+                ('Forks', 'fc1'),
+                ('Created', 'ca1'),
+                ('Last Pushed', 'pa1'),
             ])
         ]
 
@@ -335,6 +476,11 @@ class TestAnalytics(unittest.TestCase):
                             'name': 'username1',
                             'email': 'email1',
                         },
+                        'committer': {
+                            'name': 'username1',
+                            'email': 'email1',
+                        },
+                        'message': 'message1',
                     },
                 }],
                 requests.codes.OK,
@@ -348,7 +494,58 @@ class TestAnalytics(unittest.TestCase):
 
         result = analytics.get_repository_commit_emails(ghapi, "unused", "unused")
 
-        expected = {('username1', 'email1')}
+        expected = {
+            ('username1', 'email1', 'author'),
+            ('username1', 'email1', 'committer'),
+        }
+
+        assert result == expected
+
+    def test_get_repository_commit_emails_identity_sources(self):
+        return_value = [
+            (
+                [{
+                    'commit': {
+                        'author': {
+                            'name': 'username1',
+                            'email': 'email1',
+                        },
+                        'committer': {
+                            'name': 'GitHub',
+                            'email': 'noreply@github.com',
+                        },
+                        'message': 'subject\n\nCo-authored-by: username2 <email2>\n',
+                    },
+                }, {
+                    'commit': {
+                        'author': {
+                            'name': 'username1',
+                            'email': 'email1',
+                        },
+                        'committer': {
+                            'name': 'username3',
+                            'email': 'email3',
+                        },
+                        'message': 'co-authored-by:username4<email4>',
+                    },
+                }],
+                requests.codes.OK,
+            )
+        ]
+
+        ghapi = mock.MagicMock()
+        ghapi.get_repository_commits = mock.MagicMock(
+            return_value=return_value
+        )
+
+        result = analytics.get_repository_commit_emails(ghapi, "unused", "unused")
+
+        expected = {
+            ('username1', 'email1', 'author'),
+            ('username2', 'email2', 'co-author'),
+            ('username3', 'email3', 'committer'),
+            ('username4', 'email4', 'co-author'),
+        }
 
         assert result == expected
 
@@ -385,6 +582,451 @@ class TestAnalytics(unittest.TestCase):
         with pytest.raises(api.ApiCallException):
             analytics.get_repository_commit_emails(ghapi, "unused", "unused")
 
+    def test_get_repository_commit_emails_from_clone(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            origin = test_git.make_repository(directory, [
+                ("username1", "email1", "message1"),
+                ("username2", "email2", "message2\n\nCo-authored-by: username3 <email3>"),
+                ("username1", "email1", "message3"),
+            ])
+
+            result = analytics.get_repository_commit_emails_from_clone(origin)
+        finally:
+            shutil.rmtree(directory)
+
+        expected = {
+            ('username1', 'email1', 'author'),
+            ('username2', 'email2', 'author'),
+            ('username3', 'email3', 'co-author'),
+            ('committer', 'committer@example.com', 'committer'),
+        }
+
+        assert result == expected
+
+    def test_get_repository_commit_emails_from_clone_author_emails(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            origin = test_git.make_repository(directory, [
+                ("username1", "1+user1@users.noreply.github.com", "message1"),
+                ("username2", "email2", "message2"),
+            ])
+
+            ghapi = mock.MagicMock()
+            ghapi.get_user = mock.MagicMock(return_value=(
+                {'id': 1, 'login': 'user1', 'email': None},
+                requests.codes.OK,
+            ))
+            author_emails = analytics.get_user_author_emails(ghapi, 'user1')
+
+            result = analytics.get_repository_commit_emails_from_clone(origin, author_emails=author_emails)
+        finally:
+            shutil.rmtree(directory)
+
+        assert author_emails == ['1+user1@users.noreply.github.com', 'user1@users.noreply.github.com']
+        assert {name for name, _, _ in result} == {'username1', 'committer'}
+
+    @staticmethod
+    def commit_page(*names):
+        return (
+            [
+                {
+                    'commit': {
+                        'author': {'name': name, 'email': name},
+                        'committer': {'name': 'GitHub', 'email': 'noreply@github.com'},
+                        'message': 'message',
+                    },
+                }
+                for name in names
+            ],
+            requests.codes.OK,
+        )
+
+    def commit_emails_with_budget(self, pages, budget):
+        consumed = []
+
+        def paged_generator():
+            for page in pages:
+                consumed.append(page)
+                yield page
+
+        paged = paged_generator()
+
+        ghapi = mock.MagicMock()
+        ghapi.get_repository_commits = mock.MagicMock(
+            return_value=paged
+        )
+
+        result = analytics.get_repository_commit_emails(
+            ghapi,
+            "unused",
+            "unused",
+            budget=budget
+        )
+
+        return result, len(consumed), ghapi.get_repository_commits.call_args
+
+    def test_get_repository_commit_emails_max_pages(self):
+        pages = [self.commit_page('name1'), self.commit_page('name2'), self.commit_page('name3')]
+        budget = analytics.CommitBudget(max_pages=2)
+
+        result, consumed, (_, kwargs) = self.commit_emails_with_budget(pages, budget)
+
+        assert {name for name, _, _ in result} == {'name1', 'name2'}
+        assert consumed == 2
+        assert kwargs['max_pages'] == 2
+
+    def test_get_repository_commit_emails_max_commits(self):
+        pages = [self.commit_page('name1', 'name2'), self.commit_page('name3')]
+        budget = analytics.CommitBudget(max_commits=1)
+
+        result, consumed, _ = self.commit_emails_with_budget(pages, budget)
+
+        assert {name for name, _, _ in result} == {'name1'}
+        assert consumed == 1
+
+    def test_get_repository_commit_emails_max_stale_pages(self):
+        pages = [
+            self.commit_page('name1'),
+            self.commit_page('name1'),
+            self.commit_page('name1'),
+            self.commit_page('name2'),
+        ]
+        budget = analytics.CommitBudget(max_stale_pages=2)
+
+        result, consumed, _ = self.commit_emails_with_budget(pages, budget)
+
+        assert {name for name, _, _ in result} == {'name1'}
+        assert consumed == 3
+
+    def test_get_repository_commit_emails_date_window(self):
+        budget = analytics.CommitBudget(since='2020-01-01T00:00:00Z', until='2020-02-01T00:00:00Z')
+
+        _, _, call_args = self.commit_emails_with_budget([], budget)
+
+        _, kwargs = call_args
+        assert kwargs['since'] == '2020-01-01T00:00:00Z'
+        assert kwargs['until'] == '2020-02-01T00:00:00Z'
+
+    def test_get_repository_commit_emails_resume(self):
+        directory = tempfile.mkdtemp()
+        state = checkpoint.Checkpoint(os.path.join(directory, "state.sqlite"))
+
+        def interrupted_generator(owner, repository, cursor=None, **kwargs):
+            cursor.url = "https://api.github.com/next"
+            yield self.commit_page('name1')
+            raise KeyboardInterrupt()
+
+        def resumed_generator(owner, repository, cursor=None, **kwargs):
+            assert cursor.url == "https://api.github.com/next"
+            cursor.url = None
+            yield self.commit_page('name2')
+
+        ghapi = mock.MagicMock()
+
+        try:
+            ghapi.get_repository_commits = interrupted_generator
+            with pytest.raises(KeyboardInterrupt):
+                analytics.get_repository_commit_emails(ghapi, "owner", "repository", checkpoint=state)
+
+            ghapi.get_repository_commits = resumed_generator
+            result = analytics.get_repository_commit_emails(ghapi, "owner", "repository", checkpoint=state)
+
+            # Completed repositories aren't scanned again
+            ghapi.get_repository_commits = None
+            repeated = analytics.get_repository_commit_emails(ghapi, "owner", "repository", checkpoint=state)
+        finally:
+            shutil.rmtree(directory)
+
+        assert {name for name, _, _ in result} == {'name1', 'name2'}
+        assert repeated == result
+
+    def test_get_repository_commit_emails_checkpoint_budget(self):
+        directory = tempfile.mkdtemp()
+        state = checkpoint.Checkpoint(os.path.join(directory, "state.sqlite"))
+
+        ghapi = mock.MagicMock()
+
+        try:
+            ghapi.get_repository_commits = mock.MagicMock(return_value=[self.commit_page('name1')])
+            budget = analytics.CommitBudget(max_commits=1)
+            analytics.get_repository_commit_emails(ghapi, "owner", "repository", budget=budget,
+                                                   checkpoint=state)
+
+            # A scan under a smaller budget doesn't stand in for a full one
+            ghapi.get_repository_commits = mock.MagicMock(return_value=[self.commit_page('name1', 'name2')])
+            result = analytics.get_repository_commit_emails(ghapi, "owner", "repository", checkpoint=state)
+        finally:
+            shutil.rmtree(directory)
+
+        assert {name for name, _, _ in result} == {'name1', 'name2'}
+
+    def test_get_repository_contributor_statistics(self):
+        ghapi = mock.MagicMock()
+        ghapi.get_repository_contributor_statistics = mock.MagicMock(side_effect=[
+            ([], requests.codes.ACCEPTED),
+            ([
+                {
+                    'author': {'login': 'user1'},
+                    'total': 3,
+                    'weeks': [{'w': 1, 'a': 10, 'd': 2, 'c': 2}, {'w': 2, 'a': 5, 'd': 1, 'c': 1}],
+                },
+                {'author': None, 'total': 1, 'weeks': []},
+            ], requests.codes.OK),
+        ])
+
+        poll = functools.partial(scheduler.poll, sleep=lambda seconds: None)
+        with mock.patch.object(scheduler, 'poll', poll):
+            statistics = analytics.get_repository_contributor_statistics(ghapi, "owner", "repository")
+
+        contributors = analytics.add_contributor_statistics([
+            collections.OrderedDict([('Username', 'user1'), ('Contributions', 3)]),
+            collections.OrderedDict([('Username', 'user2'), ('Contributions', 1)]),
+        ], statistics)
+
+        assert contributors == [
+            collections.OrderedDict([
+                ('Username', 'user1'),
+                ('Contributions', 3),
+                ('Commits', 3),
+                ('Additions', 15),
+                ('Deletions', 3),
+            ]),
+            collections.OrderedDict([('Username', 'user2'), ('Contributions', 1)]),
+        ]
+
+    def test_get_user_event_emails(self):
+        return_value = [
+            (
+                [
+                    {
+                        'type': 'PushEvent',
+                        'payload': {
+                            'commits': [
+                                {
+                                    'author': {'name': 'name1', 'email': 'email1'},
+                                    'message': 'message\n\nCo-authored-by: name2 <email2>',
+                                },
+                            ],
+                        },
+                    },
+                    {
+                        'type': 'WatchEvent',
+                        'payload': {},
+                    },
+                ],
+                requests.codes.OK,
+            ),
+        ]
+
+        ghapi = mock.MagicMock()
+        ghapi.get_users_public_events = mock.MagicMock(
+            return_value=paged(return_value)
+        )
+
+        result = analytics.get_user_event_emails(ghapi, "unused")
+
+        expected = {
+            ('name1', 'email1', analytics.AUTHOR),
+            ('name2', 'email2', analytics.CO_AUTHOR),
+        }
+
+        assert result == expected
+
+    def test_get_user_search_emails(self):
+        def item(sha, name):
+            return {
+                'sha': sha,
+                'commit': {
+                    'author': {'name': name, 'email': 'email1'},
+                    'committer': {'name': name, 'email': 'email1'},
+                    'message': 'message',
+                },
+            }
+
+        return_value = [
+            ({'items': [item('sha1', 'name1'), item('sha1', 'fork1')]}, requests.codes.OK),
+            ({'items': [item('sha2', 'name2'), item('sha3', 'name3')]}, requests.codes.OK),
+        ]
+
+        ghapi = mock.MagicMock()
+        ghapi.search_commits = mock.MagicMock(return_value=return_value)
+
+        budget = analytics.CommitBudget(since='2020-01-01T00:00:00Z', max_commits=2)
+        result = analytics.get_user_search_emails(ghapi, "user1", budget)
+
+        (query,), _ = ghapi.search_commits.call_args
+        assert query == 'author:user1 author-date:>=2020-01-01T00:00:00Z'
+        assert {name for name, _, _ in result} == {'name1', 'name2'}
+
+    def test_get_organization_event_emails_past_last_page(self):
+        def paged_generator():
+            yield ([{
+                'type': 'PushEvent',
+                'payload': {'commits': [{'author': {'name': 'name1', 'email': 'email1'}}]},
+            }], requests.codes.OK)
+            raise api.ApiCallException(requests.codes.UNPROCESSABLE_ENTITY, {})
+
+        ghapi = mock.MagicMock()
+        ghapi.get_organizations_public_events = mock.MagicMock(
+            return_value=paged(paged_generator())
+        )
+
+        result = analytics.get_organization_event_emails(ghapi, "unused")
+
+        assert result == {('name1', 'email1', analytics.AUTHOR)}
+
+    def test_prefilter_payload(self):
+        prefilter = analytics.Prefilter('user1')
+
+        empty = {'Repository Name': 'empty', 'Size': 0}
+        untouched_fork = {
+            'Repository Name': 'fork',
+            'Size': 10,
+            'Fork': True,
+            'Created': '2020-02-01T00:00:00Z',
+            'Last Pushed': '2020-01-01T00:00:00Z',
+        }
+        pushed_fork = dict(untouched_fork, **{'Last Pushed': '2020-03-01T00:00:00Z'})
+
+        assert not prefilter(empty)
+        # Still holds the parent's history
+        assert prefilter(untouched_fork)
+        assert prefilter(pushed_fork)
+        assert prefilter.skipped == 1
+
+    def test_prefilter_contributors(self):
+        contributors = {
+            'contributor': [([{'login': 'User1'}, {'login': 'user2'}], requests.codes.OK)],
+            'other': [([{'login': 'user2'}], requests.codes.OK)],
+            'many': mock.MagicMock(
+                __iter__=mock.MagicMock(return_value=iter([([{'login': 'user2'}], requests.codes.OK)])),
+                links={'next': {'url': 'https://api.github.com/next'}},
+            ),
+        }
+
+        ghapi = mock.MagicMock()
+        ghapi.get_repository_contributors = mock.MagicMock(
+            side_effect=lambda owner, repository: contributors[repository]
+        )
+        prefilter = analytics.Prefilter('user1', ghapi)
+
+        result = [
+            prefilter({'Repository Name': name, 'Size': 10})
+            for name in ['contributor', 'other', 'many']
+        ]
+
+        assert result == [True, False, True]
+        assert prefilter.skipped == 1
+
+    def test_seen_commits(self):
+        seen = analytics.SeenCommits()
+
+        try:
+            assert not seen.all_seen(['a' * 40, 'b' * 40])
+            seen.add(['a' * 40, 'b' * 40])
+            assert seen.all_seen(['b' * 40])
+            assert not seen.all_seen(['b' * 40, 'c' * 40])
+            assert not seen.all_seen([])
+        finally:
+            seen.close()
+
+    def test_seen_commits_pickle(self):
+        seen = analytics.SeenCommits()
+
+        try:
+            seen.add(['a' * 40])
+
+            result = pickle.loads(pickle.dumps(seen))
+        finally:
+            seen.close()
+
+        # Copies within a process share one tracker
+        assert result is seen
+
+    def test_remaining_pages(self):
+        links = {'last': {'url': 'https://api.github.com/repos/o/r/commits?author=a&page=7'}}
+
+        assert analytics.remaining_pages(links, 2) == 5
+        assert analytics.remaining_pages({}, 2) == 0
+
+    def test_get_repository_commit_emails_seen(self):
+        def page(*shas):
+            commits, status_code = self.commit_page(*shas)
+            for commit, sha in zip(commits, shas):
+                commit['sha'] = sha
+            return (commits, status_code)
+
+        class Pages(object):
+            def __init__(self, pages, ahead=0):
+                self.pages = iter(pages)
+                self.links = {'last': {'url': 'https://api.github.com/r?page=10'}}
+                self.ahead = ahead
+
+            def __iter__(self):
+                return self.pages
+
+        ghapi = mock.MagicMock()
+        seen = analytics.SeenCommits()
+
+        try:
+            ghapi.get_repository_commits = mock.MagicMock(return_value=Pages([
+                page('1' * 40, '2' * 40),
+                page('3' * 40),
+            ]))
+            parent = analytics.get_repository_commit_emails(ghapi, "owner", "parent", seen=seen)
+
+            ghapi.get_repository_commits = mock.MagicMock(return_value=Pages([
+                page('4' * 40),
+                page('3' * 40),
+                page('5' * 40),
+            ]))
+            fork = analytics.get_repository_commit_emails(ghapi, "owner", "fork", seen=seen)
+        finally:
+            seen.close()
+
+        assert {name for name, _, _ in parent} == {'1' * 40, '2' * 40, '3' * 40}
+        assert {name for name, _, _ in fork} == {'4' * 40}
+        assert seen.saved_requests == 8
+
+        seen = analytics.SeenCommits()
+
+        try:
+            seen.add(['1' * 40])
+            # Two pages after the seen one were already prefetched
+            ghapi.get_repository_commits = mock.MagicMock(return_value=Pages([page('1' * 40)], ahead=2))
+            analytics.get_repository_commit_emails(ghapi, "owner", "fork", seen=seen)
+        finally:
+            seen.close()
+
+        assert seen.saved_requests == 7
+
+    def test_get_repository_commit_emails_seen_max_commits(self):
+        def page(*shas):
+            commits, status_code = self.commit_page(*shas)
+            for commit, sha in zip(commits, shas):
+                commit['sha'] = sha
+            return (commits, status_code)
+
+        ghapi = mock.MagicMock()
+        seen = analytics.SeenCommits()
+
+        try:
+            ghapi.get_repository_commits = mock.MagicMock(return_value=[page('1' * 40, '2' * 40)])
+            budget = analytics.CommitBudget(max_commits=1)
+            parent = analytics.get_repository_commit_emails(ghapi, "owner", "parent", budget=budget, seen=seen)
+
+            ghapi.get_repository_commits = mock.MagicMock(return_value=[page('2' * 40)])
+            fork = analytics.get_repository_commit_emails(ghapi, "owner", "fork", seen=seen)
+        finally:
+            seen.close()
+
+        # The commit past the parent's max_commits is still scanned in the fork
+        assert {name for name, _, _ in parent} == {'1' * 40}
+        assert {name for name, _, _ in fork} == {'2' * 40}
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 
+import json
+import threading
 import unittest
 
 try:
@@ -13,6 +15,8 @@ import requests
 import pytest
 
 from gitem import api
+from gitem import cache
+from gitem import pipeline
 
 import mocked_api_results
 
@@ -32,9 +36,7 @@ class TestApi(unittest.TestCase):
         return_value = mock.MagicMock()
 
         return_value.status_code = status_code
-        return_value.json = mock.MagicMock(
-            return_value=json_return_value
-        )
+        return_value.content = json.dumps(json_return_value).encode("utf-8")
         return_value.ok = status_code == requests.codes.OK
 
         return api.Api(oauth2_token, requester=mock.MagicMock(
@@ -50,13 +52,18 @@ class TestApi(unittest.TestCase):
             status_codes = [requests.codes.OK] * len(json_return_values)
 
         return_value = mock.MagicMock()
+        page = [-1]
+
+        def request(*args, **kwargs):
+            page[0] += 1
+            return return_value
 
         # This is some weird mock black magic...
         type(return_value).status_code = mock.PropertyMock(
             side_effect=status_codes
         )
-        return_value.json = mock.Mock(
-            side_effect=json_return_values
+        type(return_value).content = mock.PropertyMock(
+            side_effect=lambda: json.dumps(json_return_values[page[0]]).encode("utf-8")
         )
         type(return_value).ok = mock.PropertyMock(
             side_effect=[
@@ -64,9 +71,16 @@ class TestApi(unittest.TestCase):
                 for status_code in status_codes
             ]
         )
+        type(return_value).links = mock.PropertyMock(
+            side_effect=[
+                {"next": {"url": "{}/next/{}".format(api.Api.BASE_URL, i)}}
+                for i in range(len(json_return_values) - 1)
+            ] + [{}]
+        )
 
         return api.Api(oauth2_token, requester=mock.MagicMock(
-            return_value=return_value
+            return_value=return_value,
+            side_effect=request
         ))
 
     def test_ok(self):
@@ -222,6 +236,173 @@ class TestApi(unittest.TestCase):
 
         self.assertEmpty(result)
 
+    def test_paged_cursor(self):
+        mocked_json_values = [
+            mocked_api_results.get_result_value(result)
+            for result in mocked_api_results.PAGED_API_RESULT
+        ]
+
+        mocked_api = self.paged_api_will_return(mocked_json_values)
+
+        cursor = api.Cursor("{}/saved".format(api.Api.BASE_URL))
+        urls = []
+
+        for _ in mocked_api.paginated_json_call("GET", "/unused", {"type": "owner"}, cursor):
+            urls.append(cursor.url)
+
+        first_args, first_kwargs = mocked_api.requester.call_args_list[0]
+        assert first_args[1] == "{}/saved".format(api.Api.BASE_URL)
+        assert first_kwargs["params"] == {}
+        assert urls == [
+            "{}/next/0".format(api.Api.BASE_URL),
+            "{}/next/1".format(api.Api.BASE_URL),
+            None,
+        ]
+
+    def test_paged_prefetch(self):
+        mocked_json_values = [[{"page": i}] for i in range(4)]
+
+        mocked_api = self.paged_api_will_return(mocked_json_values)
+        mocked_api.prefetch = 2
+
+        cursor = api.Cursor()
+        results = []
+        urls = []
+
+        for result, status_code in mocked_api.paginated_json_call("GET", "/unused", cursor=cursor):
+            self.assertOk(status_code)
+            results.append(result)
+            urls.append(cursor.url)
+
+        assert results == mocked_json_values
+        assert urls == [
+            "{}/next/0".format(api.Api.BASE_URL),
+            "{}/next/1".format(api.Api.BASE_URL),
+            "{}/next/2".format(api.Api.BASE_URL),
+            None,
+        ]
+
+    def test_paged_prefetch_memory_released(self):
+        mocked_json_values = [[{"page": i}] for i in range(4)]
+
+        for close in [False, True]:
+            mocked_api = self.paged_api_will_return(mocked_json_values)
+            mocked_api.prefetch = 2
+            mocked_api.memory = pipeline.MemoryBudget(1)
+
+            pages = mocked_api.paginated_json_call("GET", "/unused")
+            if close:
+                next(pages)
+                pages.close()
+            else:
+                list(pages)
+            pages.thread.join()
+
+            assert mocked_api.memory.held == 0
+
+    def test_paged_prefetch_memory_shared(self):
+        def requester(method, url, params=None, headers=None):
+            path, _, number = url.rpartition("/")
+            number = int(number) if number.isdigit() else 0
+            response = mock.MagicMock()
+            response.status_code = requests.codes.OK
+            response.ok = True
+            response.content = json.dumps([{"page": number}]).encode("utf-8")
+            response.links = {}
+            if number < 3:
+                response.links["next"] = {"url": "{}/{}".format(path, number + 1)}
+            return response
+
+        mocked_api = api.Api(requester=requester, prefetch=2, memory_limit=30)
+
+        # The first iterator holds the whole budget with pages nobody takes,
+        # like a stage waiting to hand its repositories on
+        held = mocked_api.paginated_json_call("GET", "/held")
+        next(held)
+        result = []
+
+        def iterate():
+            result.extend(mocked_api.paginated_json_call("GET", "/taken"))
+
+        thread = threading.Thread(target=iterate)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        held.close()
+
+        assert not thread.is_alive()
+        assert [page for page, _ in result] == [[{"page": i}] for i in range(4)]
+
+    def test_paged_max_pages(self):
+        mocked_json_values = [[1], [2], [3], [4]]
+
+        for prefetch in [0, 3]:
+            mocked_api = self.paged_api_will_return(mocked_json_values)
+            mocked_api.prefetch = prefetch
+
+            pages = mocked_api.paginated_json_call("GET", "/unused", max_pages=2)
+            result = list(pages.items())
+
+            assert result == [1, 2]
+            assert mocked_api.requester.call_count == 2
+            assert pages.ahead == 0
+
+    def test_paged_prefetch_error(self):
+        mocked_json_values = [[{"page": 0}], {"message": "Not Found"}]
+
+        mocked_api = self.paged_api_will_return(
+            mocked_json_values,
+            [requests.codes.OK, requests.codes.NOT_FOUND]
+        )
+        mocked_api.prefetch = 1
+
+        pages = mocked_api.paginated_json_call("GET", "/unused")
+
+        assert next(pages) == ([{"page": 0}], requests.codes.OK)
+
+        with pytest.raises(api.ApiCallException) as e:
+            next(pages)
+
+        assert e.value.not_found
+
+        with pytest.raises(StopIteration):
+            next(pages)
+
+    def test_paged_exhausted(self):
+        mocked_json_values = [[1], [2]]
+
+        for prefetch in [0, 2]:
+            mocked_api = self.paged_api_will_return(mocked_json_values)
+            mocked_api.prefetch = prefetch
+
+            pages = mocked_api.paginated_json_call("GET", "/unused")
+
+            assert len(list(pages)) == 2
+            assert list(pages) == []
+
+    def test_paged_items(self):
+        mocked_json_values = [[1, 2], [3], []]
+
+        mocked_api = self.paged_api_will_return(mocked_json_values)
+
+        result = list(mocked_api.paginated_json_call("GET", "/unused").items())
+
+        assert result == [1, 2, 3]
+
+    def test_paged_close(self):
+        mocked_json_values = [[1], [2], [3]]
+
+        for prefetch in [0, 2]:
+            mocked_api = self.paged_api_will_return(mocked_json_values)
+            mocked_api.prefetch = prefetch
+
+            pages = mocked_api.paginated_json_call("GET", "/unused")
+            first = next(pages)
+            pages.close()
+
+            assert first == ([1], requests.codes.OK)
+            assert list(pages) == []
+
     def test_get_users_public_repositories_bad_type(self):
         type_ = ""
         ghapi = api.Api()
@@ -250,6 +431,34 @@ class TestApi(unittest.TestCase):
         with pytest.raises(ValueError):
             ghapi.get_organizations_public_repositories("UNUSED", type_=type_)
 
+    def test_search_commits_bad_sort(self):
+        sort = ""
+        ghapi = api.Api()
+
+        with pytest.raises(ValueError):
+            ghapi.search_commits("UNUSED", sort=sort)
+
+    def test_search_commits_bad_order(self):
+        order = ""
+        ghapi = api.Api()
+
+        with pytest.raises(ValueError):
+            ghapi.search_commits("UNUSED", order=order)
+
+    def test_get_organizations_public_repositories_bad_sort(self):
+        sort = ""
+        ghapi = api.Api()
+
+        with pytest.raises(ValueError):
+            ghapi.get_organizations_public_repositories("UNUSED", sort=sort)
+
+    def test_get_organizations_public_repositories_bad_direction(self):
+        direction = ""
+        ghapi = api.Api()
+
+        with pytest.raises(ValueError):
+            ghapi.get_organizations_public_repositories("UNUSED", direction=direction)
+
     def test_get_repository_contributors_bad_anon(self):
         anon = ""
         ghapi = api.Api()
@@ -278,6 +487,318 @@ class TestApi(unittest.TestCase):
             self.assertOk(status_code)
             assert result == expected
 
+    def test_cached_response(self):
+        response = requests.Response()
+        response.url = "https://api.github.com/orgs/unused"
+        response.status_code = requests.codes.OK
+        response._content = b'{"api results": "go here"}'
+
+        requester = mock.MagicMock(return_value=response)
+        mocked_api = api.Api(requester=requester, cache=cache.MemoryCache())
+
+        first, _ = mocked_api.get_public_organization("unused")
+        second, _ = mocked_api.get_public_organization("unused")
+
+        assert first == second == {"api results": "go here"}
+        assert requester.call_count == 1
+
+    def test_private_response_cached_per_token(self):
+        def requester_with(cache_control):
+            response = requests.Response()
+            response.url = "https://api.github.com/orgs/unused/repos"
+            response.status_code = requests.codes.OK
+            response.headers["Cache-Control"] = cache_control
+            response._content = b'[]'
+
+            return mock.MagicMock(return_value=response)
+
+        for cache_control, shared in [("private, max-age=60", False), ("public, max-age=60", True)]:
+            response_cache = cache.MemoryCache()
+
+            requester = requester_with(cache_control)
+            api.Api(["token1"], requester=requester, cache=response_cache).get_user("unused")
+            api.Api(["token2", "token1"], requester=requester, cache=response_cache).get_user("unused")
+
+            assert requester.call_count == 1
+
+            anonymous = requester_with(cache_control)
+            api.Api(requester=anonymous, cache=response_cache).get_user("unused")
+
+            assert anonymous.call_count == (0 if shared else 1)
+
+    def test_pinned_response_cached_per_token(self):
+        def requester_for(login):
+            response = requests.Response()
+            response.url = "https://api.github.com/user/orgs"
+            response.status_code = requests.codes.OK
+            response.headers["Cache-Control"] = "private, max-age=60"
+            response._content = json.dumps([{"login": login}]).encode("utf-8")
+
+            return mock.MagicMock(return_value=response)
+
+        response_cache = cache.MemoryCache()
+
+        api.Api(["tokB", "tokA"], requester=requester_for("B"), cache=response_cache).get_users_organizations()
+
+        requester = requester_for("A")
+        result, _ = api.Api(["tokA", "tokB"], requester=requester, cache=response_cache).get_users_organizations()
+
+        assert result == [{"login": "A"}]
+        assert requester.call_count == 1
+
+    def test_accepted_response_not_cached(self):
+        response = requests.Response()
+        response.url = "https://api.github.com/repos/unused/unused/stats/contributors"
+        response.status_code = requests.codes.ACCEPTED
+        response._content = b'{}'
+
+        requester = mock.MagicMock(return_value=response)
+        mocked_api = api.Api(requester=requester, cache=cache.MemoryCache())
+
+        first = mocked_api.get_repository_contributor_statistics("unused", "unused")
+        second = mocked_api.get_repository_contributor_statistics("unused", "unused")
+
+        assert first == second == ([], requests.codes.ACCEPTED)
+        assert requester.call_count == 2
+
+    def test_rate_limit_exhausted(self):
+        will_return = mocked_api_results.STANDARD_API_RESULT
+
+        mocked_api = self.api_will_return(*will_return)
+        mocked_api.requester.return_value.headers = {
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": "9999999999",
+        }
+
+        mocked_api.get_public_organization("unused")
+
+        with pytest.raises(api.ApiCallException) as e:
+            mocked_api.get_public_organization("unused")
+
+        assert e.value.rate_limiting
+        assert mocked_api.requester.call_count == 1
+
+    def test_concurrent_calls_coalesced(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        response = mock.MagicMock()
+        response.status_code = requests.codes.OK
+        response.content = b'{"api results": "go here"}'
+        response.ok = True
+
+        def requester(*args, **kwargs):
+            started.set()
+            release.wait()
+            return response
+
+        requester = mock.MagicMock(side_effect=requester)
+        mocked_api = api.Api(requester=requester)
+
+        results = []
+
+        def worker():
+            results.append(mocked_api.get_user("unused"))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+
+        # Let the follower block on the leader's in-flight request
+        waiting = threading.Semaphore(0)
+        call, = mocked_api.flights.calls.values()
+        event = call.event
+
+        class CountingEvent(object):
+            def wait(self):
+                waiting.release()
+                return event.wait()
+
+            def set(self):
+                event.set()
+
+        call.event = CountingEvent()
+
+        follower = threading.Thread(target=worker)
+        follower.start()
+        waiting.acquire()
+
+        release.set()
+        leader.join()
+        follower.join()
+
+        assert requester.call_count == 1
+        assert results == [({"api results": "go here"}, requests.codes.OK)] * 2
+
+    def test_different_params_not_coalesced(self):
+        first = api.request_key("GET", "https://api.github.com/users/unused", {"page": 1})
+        second = api.request_key("GET", "https://api.github.com/users/unused", {"page": 2})
+
+        assert first != second
+
+    def test_token_pool_most_headroom(self):
+        pool = api.TokenPool(["token1", "token2"])
+        pool.update("token1", 10, 9999999999)
+        pool.update("token2", 20, 9999999999)
+
+        assert pool.acquire() == "token2"
+
+    def test_token_pool_spreads_reservations(self):
+        pool = api.TokenPool(["token1", "token2"])
+
+        result = [pool.acquire() for _ in range(4)]
+
+        assert sorted(result) == ["token1", "token1", "token2", "token2"]
+
+    def test_token_pool_exhausted_until_reset(self):
+        now = [0]
+        pool = api.TokenPool(["token1", "token2"], clock=lambda: now[0])
+        pool.update("token1", 100, 50)
+        pool.exhaust("token2", 60)
+
+        assert pool.acquire() == "token1"
+
+        pool.exhaust("token1", 50)
+
+        with pytest.raises(api.ApiCallException) as e:
+            pool.acquire()
+
+        assert e.value.rate_limiting
+
+        now[0] = 60
+
+        assert pool.acquire() in ["token1", "token2"]
+
+    def test_token_pool_waits_for_reset(self):
+        now = [0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        pool = api.TokenPool(["token1"], clock=lambda: now[0], sleep=sleep, wait=True)
+        pool.exhaust("token1", 50)
+
+        assert pool.acquire() == "token1"
+        assert sleeps == [51]
+
+    def test_rate_limited_token_rotated(self):
+        rate_limited = mock.MagicMock()
+        rate_limited.ok = False
+        rate_limited.status_code = requests.codes.FORBIDDEN
+        rate_limited.headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "9999999999"}
+        rate_limited.content = json.dumps({
+            "documentation_url": api.ApiCallException.rate_limiting_url,
+        }).encode("utf-8")
+
+        ok = mock.MagicMock()
+        ok.ok = True
+        ok.status_code = requests.codes.OK
+        ok.headers = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "9999999999"}
+        ok.content = b"{}"
+
+        tokens = []
+
+        def requester(method, url, params, headers):
+            tokens.append(headers["Authorization"])
+            return rate_limited if len(tokens) == 1 else ok
+
+        mocked_api = api.Api(["token1", "token2"], requester=requester)
+
+        mocked_api.get_user("unused")
+
+        assert tokens == ["token token1", "token token2"]
+        assert mocked_api.tokens.budgets["token1"]["remaining"] == 0
+
+    def test_url_resource(self):
+        assert api.url_resource("https://api.github.com/search/commits") == api.SEARCH
+        assert api.url_resource("https://api.github.com/users/search") == api.CORE
+
+    def test_search_budget_separate(self):
+        response = mock.MagicMock()
+        response.ok = True
+        response.status_code = requests.codes.OK
+        response.headers = {"X-RateLimit-Remaining": "29", "X-RateLimit-Reset": "9999999999"}
+        response.content = b'{"items": []}'
+
+        mocked_api = api.Api(["token1"], requester=mock.MagicMock(return_value=response))
+
+        mocked_api.call("GET", "{}/search/commits".format(api.Api.BASE_URL), {"q": "author:unused"})
+
+        assert mocked_api.search_tokens.budgets["token1"]["remaining"] == 29
+        assert mocked_api.tokens.budgets["token1"]["remaining"] != 29
+
+    def test_authenticated_endpoint_uses_first_token(self):
+        will_return = mocked_api_results.STANDARD_API_RESULT
+
+        mocked_api = self.api_will_return(
+            *will_return,
+            oauth2_token=["token1", "token2"]
+        )
+        mocked_api.tokens.update("token1", 1, 9999999999)
+        mocked_api.tokens.update("token2", 1000, 9999999999)
+
+        mocked_api.get_organization("unused")
+
+        _, kwargs = mocked_api.requester.call_args
+        assert kwargs["headers"]["Authorization"] == "token token1"
+
+    def test_token_sent_in_header(self):
+        will_return = mocked_api_results.STANDARD_API_RESULT
+
+        mocked_api = self.api_will_return(*will_return, oauth2_token="token1")
+
+        params = {"type": "owner"}
+        mocked_api.call("GET", "https://api.github.com/users/unused/repos", params)
+
+        _, kwargs = mocked_api.requester.call_args
+        assert kwargs["headers"]["Authorization"] == "token token1"
+        assert "Authorization" not in mocked_api.headers
+        assert params == {"type": "owner"}
+
+    def test_compression_negotiated(self):
+        ghapi = self.api_will_return({})
+
+        ghapi.call("GET", "{}/users/user1".format(api.Api.BASE_URL))
+
+        _, kwargs = ghapi.requester.call_args
+        assert "gzip" in kwargs["headers"]["Accept-Encoding"]
+
+    def test_transfer_counted(self):
+        ghapi = self.api_will_return({"key": "value"})
+        ghapi.requester.return_value.raw.tell.return_value = 10
+        ghapi.profiler = mock.MagicMock()
+
+        ghapi.call("GET", "{}/users/user1".format(api.Api.BASE_URL))
+
+        ghapi.profiler.count.assert_has_calls([
+            mock.call("bytes transferred", 10),
+            mock.call("bytes decompressed", 16),
+        ])
+
+    def test_request_key_canonical(self):
+        first = api.request_key(
+            "GET",
+            "https://api.github.com/users/unused/repos?type=owner&page=2",
+            {"type": "owner"}
+        )
+        second = api.request_key(
+            "get",
+            "https://api.github.com/users/unused/repos",
+            {"page": 2, "type": "owner"}
+        )
+
+        assert first == second == "GET https://api.github.com/users/unused/repos?page=2&type=owner"
+
+    def test_request_key_token_scoped(self):
+        shared = api.request_key("GET", "https://api.github.com/user/orgs", {})
+        first = api.request_key("GET", "https://api.github.com/user/orgs", {}, "token1")
+        second = api.request_key("GET", "https://api.github.com/user/orgs", {}, "token2")
+
+        assert len({shared, first, second}) == 3
+        assert "token1" not in first
+
 
 if __name__ == "__main__":
     unittest.main()
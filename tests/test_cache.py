@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from gitem import cache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCache(unittest.TestCase):
+
+    def test_get_missing(self):
+        memory_cache = cache.MemoryCache()
+
+        assert memory_cache.get("key") is None
+
+    def test_set_get(self):
+        memory_cache = cache.MemoryCache()
+        memory_cache.set("key", "value")
+
+        assert memory_cache.get("key") == "value"
+
+    def test_expired(self):
+        clock = FakeClock()
+        memory_cache = cache.MemoryCache(ttl=10, clock=clock)
+        memory_cache.set("key", "value")
+
+        clock.now = 10
+
+        assert memory_cache.get("key") is None
+        assert len(memory_cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        memory_cache = cache.MemoryCache(max_entries=2)
+        memory_cache.set("key1", "value1")
+        memory_cache.set("key2", "value2")
+        memory_cache.get("key1")
+        memory_cache.set("key3", "value3")
+
+        assert memory_cache.get("key1") == "value1"
+        assert memory_cache.get("key2") is None
+        assert memory_cache.get("key3") == "value3"
+
+    def test_response_round_trip(self):
+        response = requests.Response()
+        response.url = "https://api.github.com/orgs/org?page=1"
+        response.status_code = requests.codes.OK
+        response.headers = requests.structures.CaseInsensitiveDict({
+            "Link": '<https://api.github.com/orgs/org?page=2>; rel="next"',
+        })
+        response._content = b'{"key": "value"}'
+
+        result = cache.load_response(cache.dump_response(response))
+
+        assert result.ok
+        assert result.json() == {"key": "value"}
+        assert result.links["next"]["url"] == "https://api.github.com/orgs/org?page=2"
+
+
+class TestSqliteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def record(content=b'{"key": "value"}'):
+        return {
+            "url": "https://api.github.com/orgs/org",
+            "status_code": requests.codes.OK,
+            "headers": {"Content-Type": "application/json"},
+            "content": content,
+        }
+
+    def test_get_missing(self):
+        sqlite_cache = cache.SqliteCache(self.directory)
+
+        assert sqlite_cache.get("key") is None
+
+    def test_set_get(self):
+        sqlite_cache = cache.SqliteCache(self.directory)
+        sqlite_cache.set("key", self.record())
+
+        assert sqlite_cache.get("key") == self.record()
+
+    def test_expired(self):
+        clock = FakeClock()
+        sqlite_cache = cache.SqliteCache(self.directory, ttl=10, clock=clock)
+        sqlite_cache.set("key", self.record())
+
+        clock.now = 10
+
+        assert sqlite_cache.get("key") is None
+        assert len(sqlite_cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        clock = FakeClock()
+        sqlite_cache = cache.SqliteCache(self.directory, max_size=8, clock=clock)
+
+        for i, key in enumerate(["key1", "key2", "key3"]):
+            clock.now = i
+            sqlite_cache.set(key, self.record(b"1234"))
+
+        clock.now = 3
+        sqlite_cache.get("key1")
+        sqlite_cache.evict()
+
+        assert sqlite_cache.get("key1") is not None
+        assert sqlite_cache.get("key2") is None
+        assert sqlite_cache.get("key3") is not None
+
+    def test_shared_between_instances(self):
+        sqlite_cache = cache.SqliteCache(self.directory)
+        copied_cache = pickle.loads(pickle.dumps(sqlite_cache))
+
+        sqlite_cache.set("key", self.record())
+
+        assert copied_cache.get("key") == self.record()
+
+
+if __name__ == "__main__":
+    unittest.main()
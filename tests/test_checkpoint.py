@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import collections
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from gitem import checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "state.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_missing(self):
+        state = checkpoint.Checkpoint(self.path)
+
+        assert state.get("key") is None
+        assert state.get_cursor("key") == (None, None)
+
+    def test_set_get(self):
+        state = checkpoint.Checkpoint(self.path)
+        value = collections.OrderedDict([("key2", "value2"), ("key1", "value1")])
+        state.set("key", value)
+
+        result = state.get("key")
+
+        assert result == value
+        assert list(result.keys()) == ["key2", "key1"]
+
+    def test_set_drops_cursor(self):
+        state = checkpoint.Checkpoint(self.path)
+        state.set_cursor("key", "https://api.github.com/next", {"pages": 1})
+
+        assert state.get_cursor("key") == ("https://api.github.com/next", {"pages": 1})
+
+        state.set("key", [])
+
+        assert state.get_cursor("key") == (None, None)
+
+    def test_resume(self):
+        state = checkpoint.Checkpoint(self.path)
+        state.set("key", "value")
+
+        assert checkpoint.Checkpoint(self.path, resume=True).get("key") == "value"
+        assert checkpoint.Checkpoint(self.path).get("key") is None
+
+    def test_pickled_copy_does_not_reset(self):
+        state = checkpoint.Checkpoint(self.path)
+        copied_state = pickle.loads(pickle.dumps(state))
+
+        state.set("key", "value")
+
+        assert copied_state.get("key") == "value"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+
+import pytest
+
+from gitem import coalesce
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_sequential_calls_are_not_shared(self):
+        flights = coalesce.SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(None)
+            return len(calls)
+
+        assert flights.do("key", func) == 1
+        assert flights.do("key", func) == 2
+
+    def test_concurrent_calls_are_shared(self):
+        flights = coalesce.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(None)
+            started.set()
+            release.wait()
+            return "result"
+
+        results = []
+
+        def worker():
+            results.append(flights.do("key", func))
+
+        leader = threading.Thread(target=worker)
+        leader.start()
+        started.wait()
+
+        # Count followers as they block on the leader's call
+        waiting = threading.Semaphore(0)
+        event = flights.calls["key"].event
+
+        class CountingEvent(object):
+            def wait(self):
+                waiting.release()
+                return event.wait()
+
+            def set(self):
+                event.set()
+
+        flights.calls["key"].event = CountingEvent()
+
+        followers = [threading.Thread(target=worker) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        for _ in followers:
+            waiting.acquire()
+
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ["result"] * 4
+
+    def test_exception(self):
+        flights = coalesce.SingleFlight()
+
+        def func():
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            flights.do("key", func)
+
+        assert flights.calls == {}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import collections
+import unittest
+
+import pytest
+
+from gitem import codec
+
+
+class TestCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = codec.backend
+
+    def tearDown(self):
+        codec.backend = self.backend
+
+    def test_loads_bytes(self):
+        for name in codec.BACKENDS:
+            codec.use(name)
+
+            result = codec.loads(b'{"key": ["value", 1, null]}')
+
+            assert result == {"key": ["value", 1, None]}
+
+    def test_loads_text(self):
+        for name in codec.BACKENDS:
+            codec.use(name)
+
+            result = codec.loads('{"key": "value"}')
+
+            assert result == {"key": "value"}
+
+    def test_loads_invalid(self):
+        for name in codec.BACKENDS:
+            codec.use(name)
+
+            with pytest.raises(ValueError):
+                codec.loads(b'{"key":')
+
+    def test_dumps_compact_ordered(self):
+        data = collections.OrderedDict([
+            ("key2", ["value1", 1]),
+            ("key1", collections.OrderedDict([("key3", None)])),
+        ])
+
+        for name in codec.BACKENDS:
+            codec.use(name)
+
+            result = codec.dumps(data)
+
+            assert result == '{"key2":["value1",1],"key1":{"key3":null}}'
+
+    def test_use_unknown(self):
+        with pytest.raises(ValueError):
+            codec.use("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
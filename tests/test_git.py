@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from gitem import git
+
+
+def make_repository(directory, commits):
+    """
+    Create a bare repository containing commits of (author name, author email, message)
+    """
+    work_tree = os.path.join(directory, "work")
+    bare = os.path.join(directory, "origin.git")
+
+    subprocess.check_call(["git", "init", "--quiet", work_tree])
+
+    for name, email, message in commits:
+        env = dict(
+            os.environ,
+            GIT_AUTHOR_NAME=name,
+            GIT_AUTHOR_EMAIL=email,
+            GIT_COMMITTER_NAME="committer",
+            GIT_COMMITTER_EMAIL="committer@example.com",
+        )
+        subprocess.check_call(
+            ["git", "-C", work_tree, "commit", "--quiet", "--allow-empty", "-m", message],
+            env=env
+        )
+
+    subprocess.check_call(["git", "clone", "--quiet", "--bare", work_tree, bare])
+
+    return bare
+
+
+class TestGit(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def clone(self, commits):
+        origin = make_repository(self.directory, commits)
+        directory = os.path.join(self.directory, "clone.git")
+
+        git.clone(origin, directory)
+
+        return directory
+
+    def test_log(self):
+        directory = self.clone([
+            ("name1", "email1@example.com", "message1"),
+            ("name2", "email2@example.com", "message2"),
+        ])
+
+        result = list(git.log(directory, ["%an", "%ae"]))
+
+        expected = [
+            ("name2", "email2@example.com"),
+            ("name1", "email1@example.com"),
+        ]
+
+        assert result == expected
+
+    def test_log_multiline_field(self):
+        directory = self.clone([
+            ("name1", "email1@example.com", "subject\n\nbody"),
+        ])
+
+        result = list(git.log(directory, ["%an", "%B"]))
+
+        expected = [("name1", "subject\n\nbody\n")]
+
+        assert result == expected
+
+    def test_log_author(self):
+        directory = self.clone([
+            ("name1", "email1@example.com", "message1"),
+            ("name2", "email2@example.com", "message2"),
+        ])
+
+        result = list(git.log(directory, ["%an"], author="email1@example.com"))
+
+        expected = [("name1",)]
+
+        assert result == expected
+
+    def test_log_author_emails(self):
+        directory = self.clone([
+            ("name1", "Email1@example.com", "message1"),
+            ("name2", "email2@example.com", "message2"),
+            ("name3", "xemail1@example.com", "message3"),
+            ("name4", "email4@example.com", "message4"),
+        ])
+
+        result = list(git.log(
+            directory,
+            ["%an"],
+            author_emails=["email1@example.com", "email4@example.com"]
+        ))
+
+        expected = [("name4",), ("name1",)]
+
+        assert result == expected
+
+    def test_log_max_count(self):
+        directory = self.clone([
+            ("name1", "email1@example.com", "message1"),
+            ("name2", "email2@example.com", "message2"),
+        ])
+
+        result = list(git.log(directory, ["%an"], max_count=1))
+
+        expected = [("name2",)]
+
+        assert result == expected
+
+    def test_log_empty_repository(self):
+        origin = os.path.join(self.directory, "origin.git")
+        subprocess.check_call(["git", "init", "--quiet", "--bare", origin])
+        directory = os.path.join(self.directory, "clone.git")
+
+        git.clone(origin, directory)
+
+        result = list(git.log(directory, ["%an"]))
+
+        assert result == []
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2 (third-party)
+    import mock
+
+import requests
+
+from gitem import __main__ as gitem_main
+from gitem import analytics
+from gitem import api
+from gitem import checkpoint
+
+
+USER_FIELDS = [
+    "login", "html_url", "name", "company", "blog", "location", "email",
+    "created_at", "updated_at", "description", "clone_url", "pushed_at",
+]
+
+
+def github(method, url, params, headers, commits_status=requests.codes.OK):
+    """
+    Answer a user scan like Github would, picklable for process pools
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = requests.codes.OK
+
+    if url.endswith("/commits"):
+        response.status_code = commits_status
+        body = [{
+            "sha": "1" * 40,
+            "commit": {
+                "author": {"name": "name1", "email": "email1"},
+                "committer": {"name": "name1", "email": "email1"},
+                "message": "message1",
+            },
+        }]
+        if commits_status != requests.codes.OK:
+            body = {"message": "Repository access blocked"}
+    elif url.endswith("/repos"):
+        body = [
+            dict({field: "" for field in USER_FIELDS}, name="repository{}".format(i),
+                 size=1, fork=False, archived=False, forks_count=0)
+            for i in range(3)
+        ]
+    elif url.endswith("/orgs"):
+        body = []
+    else:
+        body = {field: "" for field in USER_FIELDS}
+
+    response._content = json.dumps(body).encode("utf-8")
+    return response
+
+
+class TestMain(unittest.TestCase):
+
+    @staticmethod
+    def api_not_found():
+        response = requests.Response()
+        response.url = "https://api.github.com/unused"
+        response.status_code = requests.codes.NOT_FOUND
+        response._content = b'{"message": "Not Found"}'
+
+        return api.Api(requester=mock.MagicMock(return_value=response))
+
+    @staticmethod
+    def api_commits_unavailable():
+        return api.Api(requester=functools.partial(
+            github,
+            commits_status=requests.codes.UNAVAILABLE_FOR_LEGAL_REASONS
+        ))
+
+    def assert_raises(self, ghapi, command, **kwargs):
+        errors = []
+
+        def run():
+            try:
+                command(ghapi, mock.MagicMock(), verbose=False, processes=None, **kwargs)
+            except api.ApiCallException as e:
+                errors.append(e)
+
+        # A stage that swallowed the exception would leave the command
+        # waiting forever
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+
+        assert not thread.is_alive()
+        assert len(errors) == 1
+
+        return errors[0]
+
+    def assert_raises_not_found(self, command, **kwargs):
+        assert self.assert_raises(self.api_not_found(), command, **kwargs).not_found
+
+    def test_user_scan_error(self):
+        error = self.assert_raises(self.api_commits_unavailable(), gitem_main.user, name="unused")
+
+        assert error.code == requests.codes.UNAVAILABLE_FOR_LEGAL_REASONS
+        # The failed run's seen commits aren't left behind
+        assert analytics._seen_commits == {}
+
+    def test_user_processes_checkpoint(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            state = checkpoint.Checkpoint(os.path.join(directory, "state.sqlite"))
+            outputter = mock.MagicMock()
+
+            for _ in range(4):
+                # Workers forked while a stage writes the checkpoint would
+                # inherit its lock
+                gitem_main.user(
+                    api.Api(requester=github),
+                    outputter,
+                    name="user1",
+                    verbose=False,
+                    processes=2,
+                    checkpoint=state
+                )
+        finally:
+            shutil.rmtree(directory)
+
+        (emails,), _ = outputter.output.call_args
+        assert len(emails["Emails"]) == 2
+
+    def test_organization_not_found(self):
+        self.assert_raises_not_found(gitem_main.organization, name="unused")
+
+    def test_repository_not_found(self):
+        self.assert_raises_not_found(gitem_main.repository, owner="unused", name="unused")
+
+    def test_user_not_found(self):
+        self.assert_raises_not_found(gitem_main.user, name="unused")
+
+    def test_stage_exception_raised(self):
+        def stage():
+            raise api.ApiCallException(requests.codes.NOT_FOUND, {})
+
+        result, = gitem_main.start_stages(None, ("stage", stage))
+
+        with self.assertRaises(api.ApiCallException):
+            result.get()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import pickle
+import threading
+import unittest
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2 (third-party)
+    import mock
+
+from gitem import pipeline
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_memory_budget_blocks_until_released(self):
+        budget = pipeline.MemoryBudget(10)
+        budget.acquire(8)
+
+        acquired = threading.Event()
+
+        def acquire():
+            budget.acquire(5)
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+
+        assert not acquired.wait(0.1)
+
+        budget.release(8)
+        thread.join()
+
+        assert acquired.is_set()
+        assert budget.held == 5
+
+    def test_memory_budget_oversized(self):
+        budget = pipeline.MemoryBudget(10)
+
+        budget.acquire(100)
+
+        assert budget.held == 100
+
+    def test_memory_budget_owner_holding_nothing(self):
+        budget = pipeline.MemoryBudget(10)
+        budget.acquire(8, owner="a")
+
+        budget.acquire(5, owner="b")
+
+        assert budget.held == 13
+        assert budget.owners == {"a": 8, "b": 5}
+
+        budget.release(5, owner="b")
+
+        assert budget.owners == {"a": 8}
+
+    def test_memory_budget_unlimited(self):
+        budget = pipeline.MemoryBudget()
+
+        budget.acquire(100)
+        budget.acquire(100)
+
+        assert budget.held == 200
+
+    def test_memory_budget_pickle(self):
+        budget = pipeline.MemoryBudget(10)
+        budget.acquire(5)
+
+        result = pickle.loads(pickle.dumps(budget))
+
+        assert result.limit == 10
+        assert result.held == 0
+
+    def test_first(self):
+        records = mock.MagicMock()
+        records.__iter__.return_value = iter([1, 2, 3, 4])
+
+        result = pipeline.first(records, 2)
+
+        assert result == [1, 2]
+        records.close.assert_called_once_with()
+
+    def test_first_all(self):
+        result = pipeline.first(iter([1, 2, 3]))
+
+        assert result == [1, 2, 3]
+
+    def test_largest(self):
+        records = [("a", 1), ("b", 3), ("c", 1), ("d", 2), ("e", 3)]
+
+        def key(record):
+            return record[1]
+
+        for count in [None, 0, 1, 3, 10]:
+            result = pipeline.largest(iter(records), key, count)
+
+            assert result == sorted(records, key=key, reverse=True)[:count]
+
+
+if __name__ == "__main__":
+    unittest.main()
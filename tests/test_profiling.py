@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2 (third-party)
+    import mock
+
+from gitem import profiling
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_stage_breakdown(self):
+        clock = FakeClock()
+        profiler = profiling.Profiler(clock=clock)
+
+        with profiling.stage(profiler, "members"):
+            with profiling.timer(profiler, "fetch"):
+                clock.now += 3
+            with profiling.timer(profiler, "decode"):
+                clock.now += 2
+            clock.now += 1
+
+        assert profiler.stages["members"] == {"total": 6, "fetch": 3, "decode": 2}
+
+    def test_timer_outside_stage(self):
+        clock = FakeClock()
+        profiler = profiling.Profiler(clock=clock)
+
+        with profiling.timer(profiler, "fetch"):
+            clock.now += 1
+
+        assert profiler.stages["other"] == {"fetch": 1}
+
+    def test_no_profiler(self):
+        with profiling.stage(None, "members"):
+            with profiling.timer(None, "fetch"):
+                pass
+
+    def test_timed_output(self):
+        clock = FakeClock()
+        profiler = profiling.Profiler(clock=clock)
+        outputter = mock.MagicMock()
+
+        def output(data):
+            clock.now += 1
+
+        outputter.output = mock.MagicMock(side_effect=output)
+
+        profiling.TimedOutput(outputter, profiler).output({"key": "value"})
+
+        outputter.output.assert_called_once_with({"key": "value"})
+        assert profiler.stages["output"] == {"total": 1}
+
+    def test_report(self):
+        clock = FakeClock()
+        profiler = profiling.Profiler(clock=clock)
+
+        with profiling.stage(profiler, "members"):
+            with profiling.timer(profiler, "fetch"):
+                clock.now += 3
+            clock.now += 1
+        profiler.count("Requests", 2)
+
+        with io.StringIO() as stream:
+            profiler.report(stream)
+            result = stream.getvalue().splitlines()
+
+        assert result[1].split() == ["members", "4.000s", "3.000s", "0.000s", "1.000s"]
+        assert result[2] == "Requests: 2"
+
+    def test_sampled_stacks(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "stacks.txt")
+        profiler = profiling.Profiler(stacks_path=path)
+        stopped = threading.Event()
+
+        def busy_wait():
+            while not stopped.is_set():
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=busy_wait)
+        thread.start()
+
+        try:
+            profiler.start()
+            time.sleep(0.05)
+            profiler.stop()
+
+            with open(path) as fd:
+                lines = fd.read().splitlines()
+        finally:
+            stopped.set()
+            thread.join()
+            shutil.rmtree(directory)
+
+        assert any("test_profiling.py:busy_wait" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
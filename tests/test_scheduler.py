@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+import collections
+import threading
+import unittest
+from multiprocessing.pool import ThreadPool
+
+import pytest
+import requests
+
+from gitem import api
+from gitem import scheduler
+
+
+def repository(name, size=0, forks=0, pushed='', fork=False, archived=False):
+    return collections.OrderedDict([
+        ('Repository Name', name),
+        ('Size', size),
+        ('Fork', fork),
+        ('Archived', archived),
+        ('Forks', forks),
+        ('Last Pushed', pushed),
+    ])
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_prioritize_by_size(self):
+        repositories = [
+            repository('small', size=1),
+            repository('large', size=100),
+            repository('medium', size=10),
+        ]
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.prioritize(repositories)
+        ]
+
+        assert result == ['large', 'medium', 'small']
+
+    def test_prioritize_ties(self):
+        repositories = [
+            repository('old', size=1, forks=1, pushed='2019-01-01T00:00:00Z'),
+            repository('forked', size=1, forks=2, pushed='2018-01-01T00:00:00Z'),
+            repository('new', size=1, forks=1, pushed='2020-01-01T00:00:00Z'),
+        ]
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.prioritize(repositories)
+        ]
+
+        assert result == ['forked', 'new', 'old']
+
+    def test_prioritize_skip(self):
+        repositories = [
+            repository('source'),
+            repository('fork', fork=True),
+            repository('archived', archived=True),
+        ]
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.prioritize(
+                repositories,
+                skip_forks=True,
+                skip_archived=True
+            )
+        ]
+
+        assert result == ['source']
+
+    def test_produce_consume(self):
+        pages = [
+            [repository('small1', size=1), repository('large1', size=100)],
+            [repository('fork', size=1000, fork=True), repository('small2', size=1)],
+        ]
+        repository_queue = scheduler.make_queue()
+
+        listed = scheduler.produce(pages, repository_queue, skip_forks=True)
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.consume(repository_queue)
+        ]
+
+        assert result == ['large1', 'small1', 'small2']
+        assert len(listed) == 4
+
+    def test_produce_keep(self):
+        pages = [[repository('kept'), repository('dropped')]]
+        repository_queue = scheduler.make_queue()
+
+        listed = scheduler.produce(
+            pages,
+            repository_queue,
+            keep=lambda repository: repository['Repository Name'] == 'kept'
+        )
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.consume(repository_queue)
+        ]
+
+        assert result == ['kept']
+        assert len(listed) == 2
+
+    def test_produce_failure_finishes_consumers(self):
+        def pages():
+            yield [repository('repository1')]
+            raise ValueError()
+
+        repository_queue = scheduler.make_queue()
+
+        with pytest.raises(ValueError):
+            scheduler.produce(pages(), repository_queue)
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.consume(repository_queue)
+        ]
+
+        assert result == ['repository1']
+
+    def test_produce_bounded(self):
+        pages = [[repository('repository{}'.format(i)) for i in range(5)]]
+        repository_queue = scheduler.make_queue(maxsize=2)
+
+        producer = threading.Thread(target=scheduler.produce, args=(pages, repository_queue))
+        producer.start()
+
+        result = [
+            repository['Repository Name']
+            for repository in scheduler.consume(repository_queue)
+        ]
+        producer.join()
+
+        assert len(result) == 5
+
+    def test_imap_bounded_backpressure(self):
+        listed = []
+        release = threading.Event()
+
+        def pages():
+            for i in range(10):
+                listed.append(i)
+                yield [repository('repository{}'.format(i))]
+
+        def scan(name):
+            release.wait()
+            return name
+
+        repository_queue = scheduler.make_queue(maxsize=2)
+        producer = threading.Thread(target=scheduler.produce, args=(pages(), repository_queue))
+        producer.start()
+
+        pool = ThreadPool(processes=1)
+        results = scheduler.imap_bounded(
+            pool,
+            scan,
+            (repository['Repository Name'] for repository in scheduler.consume(repository_queue)),
+            1
+        )
+        pool.close()
+
+        # Listing pauses while the only worker is busy
+        producer.join(0.2)
+        assert producer.is_alive()
+        assert len(listed) < 10
+
+        release.set()
+        result = list(results)
+        producer.join()
+        pool.join()
+
+        assert sorted(result) == ['repository{}'.format(i) for i in range(10)]
+
+    def test_imap_bounded_exception(self):
+        def scan(name):
+            raise api.ApiCallException(requests.codes.NOT_FOUND, {})
+
+        pool = ThreadPool(processes=1)
+        results = scheduler.imap_bounded(pool, scan, ['repository1', 'repository2'], 1)
+        pool.close()
+
+        with pytest.raises(api.ApiCallException):
+            list(results)
+
+    def test_poll_backoff(self):
+        now = [0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        def accepted_then(result, polls):
+            responses = [(None, requests.codes.ACCEPTED)] * (polls - 1) + [(result, requests.codes.OK)]
+            return lambda: responses.pop(0)
+
+        calls = [
+            ('slow', accepted_then('slow result', 3)),
+            ('fast', accepted_then('fast result', 1)),
+            ('never', accepted_then('never result', 10)),
+        ]
+
+        result = list(scheduler.poll(calls, attempts=3, workers=1, clock=lambda: now[0], sleep=sleep))
+
+        assert result == [('fast', 'fast result'), ('slow', 'slow result'), ('never', None)]
+        assert sleeps == [1, 2]
+
+    def test_poll_exception(self):
+        def call():
+            raise api.ApiCallException(requests.codes.NOT_FOUND, {})
+
+        with pytest.raises(api.ApiCallException):
+            list(scheduler.poll([('key', call)], sleep=lambda seconds: None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+import json
+import threading
+import unittest
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2 (third-party)
+    import mock
+
+import requests
+
+from gitem import api
+from gitem import server
+
+
+class TestServer(unittest.TestCase):
+
+    @staticmethod
+    def application_with(command):
+        return server.Application(mock.MagicMock(), {"user": command})
+
+    def test_parse_path(self):
+        with mock.patch.object(server, "MAX_PROCESSES", 8):
+            result = server.parse_path("/repository/owner1/name1?verbose=true&processes=4")
+
+        expected = (
+            "repository",
+            {"owner": "owner1", "name": "name1", "verbose": True, "processes": 4, "threads": True},
+        )
+
+        assert result == expected
+
+    def test_parse_path_processes_clamped(self):
+        with mock.patch.object(server, "MAX_PROCESSES", 2):
+            _, many = server.parse_path("/user/name1?processes=1000")
+            _, negative = server.parse_path("/user/name1?processes=-1")
+
+        assert many["processes"] == 2
+        assert negative["processes"] is None
+
+    def test_parse_path_defaults(self):
+        result = server.parse_path("/user/name1")
+
+        expected = ("user", {"name": "name1", "verbose": False, "processes": None, "threads": True})
+
+        assert result == expected
+
+    def test_parse_path_unknown_command(self):
+        with self.assertRaises(server.NotFound):
+            server.parse_path("/unknown/name1")
+
+    def test_parse_path_wrong_arguments(self):
+        with self.assertRaises(server.NotFound):
+            server.parse_path("/repository/name1")
+
+    def test_handle_ok(self):
+        def command(ghapi, outputter, *args, **kwargs):
+            outputter.output({"Username": kwargs["name"]})
+
+        application = self.application_with(command)
+
+        status_code, body = application.handle("/user/name1")
+
+        assert status_code == requests.codes.OK
+        assert json.loads(body) == {"Username": "name1"}
+
+    def test_handle_not_found(self):
+        application = self.application_with(mock.MagicMock())
+
+        status_code, _ = application.handle("/unknown")
+
+        assert status_code == requests.codes.NOT_FOUND
+
+    def test_handle_api_not_found(self):
+        def command(ghapi, outputter, *args, **kwargs):
+            raise api.ApiCallException(requests.codes.NOT_FOUND, {})
+
+        application = self.application_with(command)
+
+        status_code, _ = application.handle("/user/name1")
+
+        assert status_code == requests.codes.NOT_FOUND
+
+    def test_handle_rate_limiting(self):
+        def command(ghapi, outputter, *args, **kwargs):
+            raise api.ApiCallException(requests.codes.FORBIDDEN, {
+                "documentation_url": api.ApiCallException.rate_limiting_url,
+            })
+
+        application = self.application_with(command)
+
+        status_code, _ = application.handle("/user/name1")
+
+        assert status_code == requests.codes.TOO_MANY_REQUESTS
+
+    def test_handle_internal_error(self):
+        def command(ghapi, outputter, *args, **kwargs):
+            raise KeyError("login")
+
+        application = self.application_with(command)
+
+        status_code, body = application.handle("/user/name1")
+
+        assert status_code == requests.codes.INTERNAL_SERVER_ERROR
+        assert "Error" in json.loads(body)
+
+    def test_serve_http(self):
+        def command(ghapi, outputter, *args, **kwargs):
+            outputter.output({"Username": kwargs["name"]})
+
+        httpd = server.Server(self.application_with(command), port=0)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+
+        try:
+            response = requests.get(
+                "http://{}:{}/user/name1".format(*httpd.server_address)
+            )
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join()
+
+        assert response.status_code == requests.codes.OK
+        assert response.json() == {"Username": "name1"}
+
+
+if __name__ == "__main__":
+    unittest.main()
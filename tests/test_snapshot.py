@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+from gitem import snapshot
+
+
+def repository(name, pushed):
+    return collections.OrderedDict([
+        ('Repository Name', name),
+        ('Last Pushed', pushed),
+    ])
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "snapshot.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_missing(self):
+        state = snapshot.Snapshot(self.path)
+
+        assert state.get("organization") == {}
+
+    def test_update_merges(self):
+        state = snapshot.Snapshot(self.path)
+        state.update("organization", [
+            repository("repository1", "2020-01-01T00:00:00Z"),
+            repository("repository2", "2020-02-01T00:00:00Z"),
+        ])
+        state.update("organization", [repository("repository1", "2020-03-01T00:00:00Z")])
+        state.update("other", [repository("repository3", "2020-04-01T00:00:00Z")])
+
+        result = snapshot.Snapshot(self.path).get("organization")
+
+        assert list(result.keys()) == ["repository1", "repository2"]
+        assert result["repository1"] == repository("repository1", "2020-03-01T00:00:00Z")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import pickle
+import unittest
+import warnings
+
+try:
+    # Python 3
+    from unittest import mock
+except ImportError:
+    # Python 2 (third-party)
+    import mock
+
+import pytest
+
+from gitem import api
+from gitem import transport
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_response_adapter(self):
+        response = mock.MagicMock(
+            url="https://api.github.com/users/user1",
+            status_code=404,
+            headers={"X-RateLimit-Remaining": "10"},
+            content=b'{"message": "Not Found"}',
+            links={"next": {"url": "https://api.github.com/users/user1?page=2"}},
+        )
+
+        result = transport.Http2Response(response)
+
+        assert result.url == "https://api.github.com/users/user1"
+        assert result.status_code == 404
+        assert not result.ok
+        assert result.headers == {"X-RateLimit-Remaining": "10"}
+        assert result.content == b'{"message": "Not Found"}'
+        assert result.links["next"]["url"] == "https://api.github.com/users/user1?page=2"
+
+    def test_transferred_bytes_raw(self):
+        response = mock.MagicMock(spec=["raw", "content"])
+        response.raw.tell.return_value = 120
+
+        result = transport.transferred_bytes(response)
+
+        assert result == 120
+
+    def test_transferred_bytes_http2(self):
+        response = transport.Http2Response(mock.MagicMock(num_bytes_downloaded=80))
+
+        result = transport.transferred_bytes(response)
+
+        assert result == 80
+
+    def test_transferred_bytes_unknown(self):
+        response = mock.MagicMock(spec=["raw", "content"])
+        response.raw = None
+
+        result = transport.transferred_bytes(response)
+
+        assert result is None
+
+    def test_get_requester_http1(self):
+        result = transport.get_requester(pool_size=20)
+
+        assert not isinstance(result, transport.Http2Requester)
+        assert result.__self__.get_adapter("https://api.github.com")._pool_maxsize == 20
+
+    @mock.patch("gitem.transport.httpx", None)
+    def test_get_requester_http2_unavailable(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+
+            result = transport.get_requester(http2=True)
+
+        assert not isinstance(result, transport.Http2Requester)
+        assert len(caught) == 1
+
+    @pytest.mark.skipif(transport.httpx is None, reason="requires the http2 extra")
+    def test_get_requester_http2(self):
+        result = transport.get_requester(http2=True)
+
+        assert isinstance(result, transport.Http2Requester)
+
+    def test_requester_pickle(self):
+        requester = transport.Http2Requester(timeout=10)
+        requester.http_client = mock.MagicMock()
+
+        result = pickle.loads(pickle.dumps(requester))
+
+        assert result.timeout == 10
+        assert result.http_client is None
+
+    def test_requester_call(self):
+        requester = transport.Http2Requester()
+        requester.http_client = mock.MagicMock()
+
+        result = requester("GET", "https://api.github.com/users/user1", params={"page": 2})
+
+        requester.http_client.request.assert_called_once_with(
+            "GET",
+            "https://api.github.com/users/user1",
+            params={"page": 2},
+            headers=None
+        )
+        assert result.response is requester.http_client.request.return_value
+
+    @pytest.mark.skipif(transport.httpx is None, reason="requires the http2 extra")
+    def test_requester_pages(self):
+        def handler(request):
+            page = int(request.url.params.get("page", "1"))
+            headers = {}
+            if page < 3:
+                headers["Link"] = '<{}/users/user1/repos?page={}>; rel="next"'.format(api.Api.BASE_URL, page + 1)
+
+            return transport.httpx.Response(200, headers=headers, json=[{"page": page}])
+
+        requester = transport.Http2Requester(transport=transport.httpx.MockTransport(handler))
+        ghapi = api.Api(requester=requester)
+
+        result = list(ghapi.get_users_public_repositories("user1").items())
+
+        assert result == [{"page": 1}, {"page": 2}, {"page": 3}]
+
+    def test_requester_close(self):
+        requester = transport.Http2Requester()
+        http_client = requester.http_client = mock.MagicMock()
+
+        requester.close()
+
+        http_client.close.assert_called_once_with()
+        assert requester.http_client is None
+
+
+if __name__ == "__main__":
+    unittest.main()